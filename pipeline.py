@@ -1,18 +1,24 @@
 import argparse
 import datetime
 import logging.config
+import sys
 from pathlib import Path
 
 import yaml
 
 import src.acquire_data as ad
 import src.analysis as eda
+import src.artifact_writer as aw
 import src.aws_utils as aws
 import src.create_dataset as cd
+import src.data_statistics as ds
 import src.evaluate_performance as ep
 import src.generate_features as gf
+import src.incremental as inc
+import src.run_registry as rr
 import src.score_model as sm
 import src.train_model as tm
+import src.validate_data as vd
 
 logging.config.fileConfig("config/logging/local.conf")
 logger = logging.getLogger("clouds")
@@ -46,33 +52,106 @@ if __name__ == "__main__":
     with (artifacts / "config.yaml").open("w") as f:
         yaml.dump(config, f)
 
+    # Time each stage so the run registry can record where the time went
+    timings = {}
+
+    # Write artifacts in the background so saving overlaps with the next stage
+    writer = aw.ArtifactWriter.from_config(config.get("artifact_writer", {}))
+
     # Acquire data from online repository and save to disk
-    ad.acquire_data(run_config["data_source"], artifacts / "clouds.data")
+    with rr.timed(timings, "acquire_data"):
+        ad.acquire_data(run_config["data_source"], artifacts / "clouds.data")
+
+    # In incremental mode only the raw lines appended since the last run are used
+    incremental_config = config.get("incremental", {})
+    incremental = incremental_config.get("enabled", False)
+    if incremental:
+        state_dir = Path(incremental_config.get("state_dir", "runs/incremental"))
+        state = inc.load_state(state_dir)
 
     # Create structured dataset from raw data; save to disk
-    data = cd.create_dataset(artifacts / "clouds.data", config["create_dataset"])
-    cd.save_dataset(data, artifacts / "clouds.csv")
+    with rr.timed(timings, "create_dataset"):
+        if incremental:
+            lines, first_line, offset = inc.read_new_lines(artifacts / "clouds.data", state)
+            data = cd.parse_lines(lines, config["create_dataset"], first_line)
+            if lines and data.empty:
+                logger.error("None of the %d new raw lines fall in a create_dataset class range; set the "
+                             "end of the last range to null (e.g. class_2: [1082, null]) to include them.",
+                             len(lines))
+                writer.close()
+                sys.exit(1)
+        else:
+            data = cd.create_dataset(artifacts / "clouds.data", config["create_dataset"])
+        writer.submit(cd.save_dataset, data, artifacts / "clouds.csv")
+        ds.profile_data(data, "raw", config.get("statistics", {}), artifacts, writer)
+
+    # Validate the dataset and feature inputs; save quarantined rows to disk
+    with rr.timed(timings, "validate_data"):
+        data, quarantined = vd.validate_data(data, config.get("validate_data", {}),
+                                             config["generate_features"],
+                                             config["create_dataset"]["columns"])
+        writer.submit(vd.save_quarantine, quarantined, artifacts / "quarantined.csv")
+
+    if incremental and data.empty:
+        if lines:
+            # Quarantined rows would fail validation again, so their lines count as consumed
+            logger.warning("All %d new rows were quarantined; nothing to retrain.", len(quarantined))
+            inc.advance_offset(state, state_dir, artifacts / "clouds.data", offset, first_line + len(lines))
+        else:
+            logger.info("No new data since the last incremental run; nothing to retrain.")
+        writer.close()
+        sys.exit(0)
 
     # Enrich dataset with features for model training; save to disk
-    features = gf.generate_features(data, config["generate_features"])
+    with rr.timed(timings, "generate_features"):
+        features = gf.generate_features(data, config["generate_features"])
+        ds.profile_data(features, "features", config.get("statistics", {}), artifacts, writer)
 
     # Generate statistics and visualizations for summarizing the data; save to disk
-    figures = artifacts / "figures"
-    figures.mkdir()
-    eda.save_figures(features, figures)
+    with rr.timed(timings, "analysis"):
+        figures = artifacts / "figures"
+        figures.mkdir()
+        eda.save_figures(features, figures, writer)
 
     # Split data into train/test set and train model based on config; save each to disk
-    tmo, train, test = tm.train_model(features, config["train_model"])
-    tm.save_data(train, test, artifacts)
-    tm.save_model(tmo, artifacts / "trained_model_object.pkl")
+    with rr.timed(timings, "train_model"):
+        if incremental:
+            new_train, new_test = inc.split_rows(features, config["train_model"]["test_size"])
+            tmo, train, test = inc.train_incremental(new_train, new_test, state, state_dir,
+                                                     config["train_model"], incremental_config)
+        else:
+            tmo, train, test = tm.train_model(features, config["train_model"])
+        writer.submit(cd.save_dataset, train, artifacts / "train.csv")
+        writer.submit(cd.save_dataset, test, artifacts / "test.csv")
+        writer.submit(tm.save_model, tmo, artifacts / "trained_model_object.pkl")
 
     # Score model on test set; save scores to disk
-    scores = sm.score_model(test, tmo, config["score_model"])
-    sm.save_scores(scores, artifacts / "scores.csv")
+    with rr.timed(timings, "score_model"):
+        scores = sm.score_model(test, tmo, config["score_model"])
+        writer.submit(sm.save_scores, scores, artifacts / "scores.csv")
 
     # Evaluate model performance metrics; save metrics to disk
-    metrics = ep.evaluate_performance(scores, config["evaluate_performance"])
-    ep.save_metrics(metrics, artifacts / "metrics.yaml")
+    with rr.timed(timings, "evaluate_performance"):
+        metrics = ep.evaluate_performance(scores, config["evaluate_performance"])
+        writer.submit(ep.save_metrics, metrics, artifacts / "metrics.yaml")
+
+    # Wait for all artifacts to be on disk before indexing and uploading them
+    with rr.timed(timings, "write_artifacts"):
+        writer.close()
+
+    # Consume the new lines only once the update has been evaluated and saved
+    if incremental:
+        with rr.timed(timings, "commit_incremental"):
+            inc.commit_update(state, state_dir, tmo, new_train, new_test, artifacts / "clouds.data",
+                              offset, first_line + len(lines), incremental_config)
+
+    # Record the run in the registry index for fast lookup and comparison
+    rr.save_timings(timings, artifacts / rr.TIMINGS_FILE)
+    registry_path = Path(run_config.get("registry", artifacts.parent / "registry.sqlite"))
+    registry = rr.connect(registry_path)
+    rr.index_run(registry, artifacts, ep.to_builtin(metrics))
+    registry.close()
+    logger.info("Run %s indexed in %s", artifacts.name, registry_path)
 
     # Upload all artifacts to S3
     aws_config = config.get("aws")
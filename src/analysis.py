@@ -1,17 +1,47 @@
+import io
 import logging
 from pathlib import Path
+from typing import Optional
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from src.artifact_writer import ArtifactWriter
 
 # Create a logger
 LOGGER = logging.getLogger(__name__)
 
-def plot_histograms(features: pd.DataFrame, output_path: Path) -> None:
+def render_figure(fig: Figure) -> bytes:
+    """
+    Renders a figure to PNG bytes.
+
+    :param fig: The figure to render.
+    :return: The PNG image.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+def save_figure(png: bytes, fig_path: Path) -> None:
+    """
+    Saves a rendered figure to the specified path.
+
+    :param png: The PNG image returned by render_figure.
+    :param fig_path: Path to save the image.
+    """
+    with open(fig_path, "wb") as file:
+        file.write(png)
+    LOGGER.debug("Histogram saved to %s", fig_path)
+
+def plot_histograms(features: pd.DataFrame, output_path: Path,
+                    writer: Optional[ArtifactWriter] = None) -> None:
     """
     Plots histograms for each feature in a DataFrame, excluding the "class" feature.
     
     :param features: DataFrame containing the features.
     :param output_path: Path to save the histogram images.
+    :param writer: Optional background writer; if given, figures are rendered here and
+        the images are saved asynchronously. Failed writes are logged, not raised.
     """
     LOGGER.info("Starting to plot histograms.")
     target = features["class"]
@@ -26,23 +56,28 @@ def plot_histograms(features: pd.DataFrame, output_path: Path) -> None:
                 ax.set_xlabel(" ".join(feat.split("_")).capitalize())
                 ax.set_ylabel("Number of observations")
                 fig_filename = output_path / f"{feat}_histogram.png"
-                fig.savefig(fig_filename)
-                LOGGER.info("Histogram saved to %s", fig_filename)
+                png = render_figure(fig)
+                if writer is None:
+                    save_figure(png, fig_filename)
+                else:
+                    writer.submit(save_figure, png, fig_filename, fatal=False)
             except (OSError, FileNotFoundError) as e:
                 LOGGER.error("Failed to plot or save histogram for %s. Error: %s", feat, e)
             finally:
                 plt.close(fig)
 
-def save_figures(data: pd.DataFrame, figures_path: Path) -> None:
+def save_figures(data: pd.DataFrame, figures_path: Path,
+                 writer: Optional[ArtifactWriter] = None) -> None:
     """
     Save histograms for each feature in a DataFrame to a specified path.
     
     :param data: DataFrame containing the features.
     :param figures_path: Path to save the histogram images.
+    :param writer: Optional background writer; if given, figures are saved asynchronously.
     """
     LOGGER.info("Saving figures to %s", figures_path)
     try:
-        plot_histograms(data, figures_path)
+        plot_histograms(data, figures_path, writer)
         LOGGER.info("Figures saved successfully.")
     except (OSError, FileNotFoundError) as e:
         LOGGER.error("Failed to save figures. Error: %s", e)
@@ -0,0 +1,148 @@
+"""
+This module provides a bounded background writer that saves artifacts while the
+pipeline keeps computing. Every artifact is written to a temporary file, synced
+and atomically renamed, so a partially written artifact is never visible.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(save_fn: Callable[[Any, Path], None], obj: Any, path: Path, fsync: bool = True) -> Path:
+    """
+    Saves an object with save_fn to a temporary file next to path, then renames it into place.
+
+    The temporary file keeps the target's suffix so writers that infer the format
+    from the extension (pandas, matplotlib) behave the same as for the final path.
+    save_fn only ever sees the temporary path, so the final path is logged here.
+
+    Args:
+        save_fn: A function called as save_fn(obj, path), e.g. create_dataset.save_dataset.
+        obj: The object to save.
+        path: The final artifact path.
+        fsync: Whether to flush the file and its directory to disk before and after the rename.
+
+    Returns:
+        The final artifact path.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.stem}.{uuid.uuid4().hex[:8]}.tmp{path.suffix}")
+    try:
+        save_fn(obj, tmp)
+        if fsync:
+            _fsync_path(tmp)
+        os.replace(tmp, path)
+        if fsync:
+            _fsync_path(path.parent)
+        logger.info("Artifact saved to %s", path)
+    except Exception:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+    return path
+
+
+def _write_logged(save_fn: Callable[[Any, Path], None], obj: Any, path: Path, fsync: bool = True) -> Optional[Path]:
+    """
+    Like write_atomic, but logs an OSError instead of raising it.
+    """
+    try:
+        return write_atomic(save_fn, obj, path, fsync)
+    except OSError as e:
+        logger.error("Failed to write artifact %s: %s", path, e)
+        return None
+
+
+class ArtifactWriter:
+    """
+    Writes artifacts on a small pool of background threads.
+
+    At most max_pending artifacts may be queued or in flight; submit blocks until
+    a slot frees up, so a fast producer cannot accumulate unbounded memory.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, fsync: bool = True):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._fsync = fsync
+        self._pending: Dict[Path, List[Future]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ArtifactWriter":
+        return cls(config.get("workers", 2), config.get("max_pending", 8), config.get("fsync", True))
+
+    def submit(self, save_fn: Callable[[Any, Path], None], obj: Any, path: Path, fatal: bool = True) -> Future:
+        """
+        Queues obj to be saved to path by save_fn. The object must not be modified
+        afterwards until the write has completed. If fatal is False, an OSError while
+        writing is logged rather than raised by wait and close.
+        """
+        path = Path(path)
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(write_atomic if fatal else _write_logged, save_fn, obj, path, self._fsync)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._pending.setdefault(path, []).append(future)
+        logger.debug("Queued artifact %s", path)
+        return future
+
+    def wait(self, path: Optional[Path] = None) -> None:
+        """
+        Blocks until the artifact at path, or every queued artifact, has been written.
+
+        Raises:
+            Exception: The first error raised while writing the awaited artifacts.
+        """
+        with self._lock:
+            if path is None:
+                futures = [(artifact, f) for artifact, pending in self._pending.items() for f in pending]
+            else:
+                futures = [(Path(path), f) for f in self._pending.get(Path(path), [])]
+        for artifact, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Failed to write artifact %s: %s", artifact, e)
+                raise
+            finally:
+                with self._lock:
+                    pending = self._pending.get(artifact, [])
+                    if future in pending:
+                        pending.remove(future)
+                    if not pending:
+                        self._pending.pop(artifact, None)
+
+    def close(self) -> None:
+        """
+        Waits for all queued artifacts and stops the writer threads.
+        """
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "ArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
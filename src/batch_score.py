@@ -0,0 +1,398 @@
+"""
+This module scores many large input files with a saved model by splitting them
+into byte-range work units that worker processes, local or on other hosts sharing
+the filesystem, claim from a SQLite-backed queue.
+"""
+
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.base import BaseEstimator
+
+import src.score_model as sm
+import src.train_model as tm
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = "queue.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    claimed_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units (status, id);
+"""
+
+
+def connect_queue(output_dir: Path) -> sqlite3.Connection:
+    """
+    Open the work queue in the output directory, creating it if needed.
+
+    Args:
+        output_dir: The shared directory holding the queue and output partitions.
+
+    Returns:
+        An open connection to the queue.
+    """
+    conn = sqlite3.connect(str(Path(output_dir) / QUEUE_FILE), timeout=60, isolation_level=None)
+    # WAL needs shared memory on one host; the rollback journal only needs file locks,
+    # so workers on other hosts sharing the directory still claim units exclusively
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def split_file(path: Path, unit_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file into byte ranges of roughly unit_bytes that start and end on
+    line boundaries, skipping the header line.
+
+    Args:
+        path: The CSV file to split.
+        unit_bytes: The target size of each range in bytes.
+
+    Returns:
+        A list of (start, end) byte offsets.
+    """
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        f.readline()
+        boundaries = [f.tell()]
+        while boundaries[-1] < size:
+            f.seek(boundaries[-1] + unit_bytes)
+            f.readline()
+            boundaries.append(min(f.tell(), size))
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def plan_units(inputs: List[Path], output_dir: Path, config: Dict) -> int:
+    """
+    Create the work queue with one unit per byte range of every input file.
+
+    Planning is idempotent: if the queue already holds units, nothing is added.
+
+    Args:
+        inputs: The CSV files to score.
+        output_dir: The shared directory for the queue and output partitions.
+        config: The batch_score configuration dictionary.
+
+    Returns:
+        The number of units in the queue.
+    """
+    output_dir = Path(output_dir)
+    (output_dir / "partitions").mkdir(parents=True, exist_ok=True)
+    conn = connect_queue(output_dir)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        existing = conn.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+        if existing:
+            conn.execute("COMMIT")
+            logger.info("Queue already planned with %d units.", existing)
+            return existing
+        units = [
+            (str(Path(path).resolve()), start, end)
+            for path in inputs
+            for start, end in split_file(Path(path), config.get("unit_bytes", 64 * 2 ** 20))
+        ]
+        conn.executemany("INSERT INTO units (path, start, end) VALUES (?, ?, ?)", units)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    logger.info("Planned %d work units from %d input files.", len(units), len(inputs))
+    return len(units)
+
+
+def claim_unit(
+    conn: sqlite3.Connection,
+    worker: str,
+    lease_seconds: float,
+    max_attempts: int
+) -> Optional[Tuple]:
+    """
+    Atomically claim the next pending unit, or a running unit whose lease has expired.
+
+    A unit whose lease expired after max_attempts claims, e.g. because it keeps
+    killing its worker, is marked failed instead of being claimed again.
+
+    Returns:
+        The claimed (id, path, start, end), or None if no work is left.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE units SET status = 'failed', error = 'lease expired after ' || attempts || ' attempts' "
+            "WHERE status = 'running' AND claimed_at < ? AND attempts >= ?",
+            (now - lease_seconds, max_attempts),
+        )
+        unit = conn.execute(
+            "SELECT id, path, start, end FROM units WHERE status = 'pending' "
+            "OR (status = 'running' AND claimed_at < ? AND attempts < ?) ORDER BY id LIMIT 1",
+            (now - lease_seconds, max_attempts),
+        ).fetchone()
+        if unit is not None:
+            conn.execute(
+                "UPDATE units SET status = 'running', attempts = attempts + 1, worker = ?, "
+                "claimed_at = ? WHERE id = ?",
+                (worker, now, unit[0]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return unit
+
+
+def read_unit(path: Path, start: int, end: int) -> pd.DataFrame:
+    """
+    Read the rows of a CSV file between two byte offsets, using the file's header.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        body = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + body))
+
+
+def score_unit(data: pd.DataFrame, model: BaseEstimator, config: Dict) -> pd.DataFrame:
+    """
+    Score a unit of rows with the same logic as score_model. Every unit has the
+    same columns: y_true holds the input's class column, or NaN without one.
+
+    Args:
+        data: The rows to score.
+        model: The trained model.
+        config: The score_model configuration dictionary.
+
+    Returns:
+        pd.DataFrame: The predicted classes and, if configured, class probabilities.
+    """
+    scores = {"y_true": data["class"].to_numpy() if "class" in data else np.full(len(data), np.nan)}
+    if config.get("predict_proba", True):
+        scores["y_pred_proba"] = sm.predict_proba(model, data, config["initial_features"])
+    scores["y_pred"] = sm.predict(model, data, config["initial_features"])
+    return pd.DataFrame(scores)
+
+
+def partition_path(output_dir: Path, unit_id: int) -> Path:
+    return Path(output_dir) / "partitions" / f"part-{unit_id:08d}.csv"
+
+
+def run_worker(output_dir: Path, model_path: Path, config: Dict, score_config: Dict) -> int:
+    """
+    Claim and score units until the queue is drained.
+
+    Each partition is written to a temporary file, flushed to disk and renamed into
+    place, so a partition is either complete or absent. Units that fail are returned
+    to the queue until they reach max_attempts.
+
+    Args:
+        output_dir: The shared directory holding the queue and output partitions.
+        model_path: The model saved by train_model.save_model.
+        config: The batch_score configuration dictionary.
+        score_config: The score_model configuration dictionary.
+
+    Returns:
+        The number of units this worker completed.
+    """
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    max_attempts = config.get("max_attempts", 3)
+    lease_seconds = config.get("lease_seconds", 600)
+    model = tm.load_model(model_path)
+    conn = connect_queue(output_dir)
+    completed = 0
+    try:
+        while True:
+            unit = claim_unit(conn, worker, lease_seconds, max_attempts)
+            if unit is None:
+                break
+            unit_id, path, start, end = unit
+            logger.debug("Worker %s scoring unit %d (%s bytes %d-%d)", worker, unit_id, path, start, end)
+            try:
+                scores = score_unit(read_unit(Path(path), start, end), model, score_config)
+                target = partition_path(output_dir, unit_id)
+                tmp = target.with_name(f"{target.name}.{worker}.tmp")
+                with open(tmp, "w", newline="") as f:
+                    scores.to_csv(f, index=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, target)
+            except Exception as e:
+                logger.error("Worker %s failed on unit %d: %s", worker, unit_id, e)
+                conn.execute(
+                    "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                    "error = ? WHERE id = ?",
+                    (max_attempts, str(e), unit_id),
+                )
+                continue
+            conn.execute("UPDATE units SET status = 'done', error = NULL WHERE id = ?", (unit_id,))
+            completed += 1
+    finally:
+        conn.close()
+    logger.info("Worker %s completed %d units.", worker, completed)
+    return completed
+
+
+def queue_status(output_dir: Path) -> Dict[str, int]:
+    """
+    Count the units in each status.
+    """
+    conn = connect_queue(output_dir)
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM units GROUP BY status"))
+    finally:
+        conn.close()
+
+
+def merge_partitions(output_dir: Path, merged_path: Path) -> int:
+    """
+    Concatenate all partitions in unit order into a single CSV file.
+
+    Because units are numbered in input-file and byte order, the merged output is
+    identical regardless of how many workers ran or which worker scored which unit.
+
+    Raises:
+        RuntimeError: If any unit has not been scored successfully, or if the
+            partitions do not all have the same header.
+
+    Returns:
+        The number of partitions merged.
+    """
+    status = queue_status(output_dir)
+    unfinished = {s: n for s, n in status.items() if s != "done"}
+    if unfinished:
+        logger.error("Cannot merge partitions; unfinished units: %s", unfinished)
+        raise RuntimeError(f"Cannot merge partitions; unfinished units: {unfinished}")
+
+    conn = connect_queue(output_dir)
+    try:
+        unit_ids = [row[0] for row in conn.execute("SELECT id FROM units ORDER BY id")]
+    finally:
+        conn.close()
+
+    tmp = Path(f"{merged_path}.tmp")
+    expected_header = None
+    with open(tmp, "wb") as out:
+        for unit_id in unit_ids:
+            with open(partition_path(output_dir, unit_id), "rb") as part:
+                header = part.readline()
+                if expected_header is None:
+                    expected_header = header
+                    out.write(header)
+                elif header != expected_header:
+                    out.close()
+                    tmp.unlink()
+                    logger.error("Partition %d has header %r, expected %r", unit_id, header, expected_header)
+                    raise RuntimeError(f"Partition {unit_id} has header {header!r}, expected {expected_header!r}")
+                while True:
+                    block = part.read(2 ** 20)
+                    if not block:
+                        break
+                    out.write(block)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, merged_path)
+    logger.info("Merged %d partitions into %s", len(unit_ids), merged_path)
+    return len(unit_ids)
+
+
+def run_local(
+    inputs: List[Path],
+    output_dir: Path,
+    model_path: Path,
+    config: Dict,
+    score_config: Dict
+) -> Path:
+    """
+    Plan, score with several local worker processes, and merge the output.
+
+    Args:
+        inputs: The CSV files to score.
+        output_dir: The directory for the queue, partitions and merged scores.
+        model_path: The model saved by train_model.save_model.
+        config: The batch_score configuration dictionary.
+        score_config: The score_model configuration dictionary.
+
+    Returns:
+        The path of the merged scores file.
+    """
+    output_dir = Path(output_dir)
+    plan_units(inputs, output_dir, config)
+    workers = config.get("workers", os.cpu_count() or 1)
+    logger.info("Starting %d local workers.", workers)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(output_dir, model_path, config, score_config))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    merged_path = output_dir / "scores.csv"
+    merge_partitions(output_dir, merged_path)
+    return merged_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded batch scoring with a saved model")
+    parser.add_argument("--config", default="config/default-config.yaml",
+                        help="Path to configuration file")
+    parser.add_argument("--output", required=True, help="Shared directory for the queue and output")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Split input files into work units")
+    plan_parser.add_argument("inputs", nargs="+", help="CSV files to score")
+
+    worker_parser = subparsers.add_parser("worker", help="Score units until the queue is drained")
+    worker_parser.add_argument("--model", required=True, help="Path to the saved model")
+
+    subparsers.add_parser("merge", help="Merge scored partitions into scores.csv")
+    subparsers.add_parser("status", help="Show the number of units in each status")
+
+    run_parser = subparsers.add_parser("run", help="Plan, score with local workers and merge")
+    run_parser.add_argument("inputs", nargs="+", help="CSV files to score")
+    run_parser.add_argument("--model", required=True, help="Path to the saved model")
+    run_parser.add_argument("--workers", type=int, help="Number of local worker processes")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    with open(args.config, "r") as f:
+        config = yaml.load(f, Loader=yaml.FullLoader)
+    batch_config = config.get("batch_score", {})
+    output = Path(args.output)
+
+    if args.command == "plan":
+        plan_units([Path(p) for p in args.inputs], output, batch_config)
+    elif args.command == "worker":
+        run_worker(output, Path(args.model), batch_config, config["score_model"])
+    elif args.command == "merge":
+        merge_partitions(output, output / "scores.csv")
+    elif args.command == "status":
+        print(queue_status(output))
+    elif args.command == "run":
+        if args.workers:
+            batch_config["workers"] = args.workers
+        run_local([Path(p) for p in args.inputs], output, Path(args.model),
+                  batch_config, config["score_model"])
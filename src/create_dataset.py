@@ -1,12 +1,42 @@
 import logging
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 import pandas as pd
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+def parse_lines(lines: List[str], config: Dict[str, Tuple[int, int]], first_line: int = 0) -> pd.DataFrame:
+    """
+    Parse raw data lines into a dataset, labelling each line by the class range
+    that contains its line number.
+
+    Args:
+        lines: The raw lines to parse.
+        config: The configuration dict defining columns and class ranges. A range
+            end of None leaves the range open so appended lines are included.
+        first_line: The line number of the first of the given lines in the raw file.
+
+    Returns:
+        A pandas DataFrame representing the dataset.
+    """
+    columns = config['columns']
+    data = [[s for s in line.split(' ') if s != ''] for line in lines]
+
+    clouds = []
+    for label, class_key in enumerate(['class_1', 'class_2']):
+        start, end = config[class_key]
+        start = max(start - first_line, 0)
+        end = None if end is None else max(end - first_line, 0)
+        cloud = [[float(s.replace('/n', '')) for s in c] for c in data[start:end]]
+        cloud = pd.DataFrame(cloud, columns=columns, dtype=float)
+        cloud['class'] = np.full(len(cloud), float(label))
+        clouds.append(cloud)
+
+    # Concatenate dataframes for training
+    return pd.concat(clouds)
+
 def create_dataset(file_path: Path, config: Dict[str, Tuple[int, int]]) -> pd.DataFrame:
     """
     Create a dataset from the provided file path and configuration.
@@ -18,13 +48,9 @@ def create_dataset(file_path: Path, config: Dict[str, Tuple[int, int]]) -> pd.Da
     Returns:
         A pandas DataFrame representing the dataset.
     """
-    columns = config['columns']
-    class_1_range = config['class_1']
-    class_2_range = config['class_2']
-
     try:
         with file_path.open('r') as f:
-            data = [[s for s in line.split(' ') if s != ''] for line in f.readlines()]
+            lines = f.readlines()
     except FileNotFoundError:
         logger.error('File not found at the provided path: %s', file_path)
         raise
@@ -32,22 +58,7 @@ def create_dataset(file_path: Path, config: Dict[str, Tuple[int, int]]) -> pd.Da
         logger.error('An error occurred while opening the file: %s', e)
         raise
 
-    # Get first cloud class
-    first_cloud = data[class_1_range[0]:class_1_range[1]]
-    first_cloud = [[float(s.replace('/n', '')) for s in cloud] for cloud in first_cloud]
-    first_cloud = pd.DataFrame(first_cloud, columns=columns)
-    first_cloud['class'] = np.zeros(len(first_cloud))
-
-    # Get second cloud class
-    second_cloud = data[class_2_range[0]:class_2_range[1]]
-    second_cloud = [[float(s.replace('/n', '')) for s in cloud] for cloud in second_cloud]
-    second_cloud = pd.DataFrame(second_cloud, columns=columns)
-    second_cloud['class'] = np.ones(len(second_cloud))
-
-    # Concatenate dataframes for training
-    data = pd.concat([first_cloud, second_cloud])
-
-    return data
+    return parse_lines(lines, config)
 
 def save_dataset(data: pd.DataFrame, save_path: Path) -> None:
     """
@@ -59,7 +70,7 @@ def save_dataset(data: pd.DataFrame, save_path: Path) -> None:
     """
     try:
         data.to_csv(save_path, index=False)
-        logger.info('Data successfully saved to %s', save_path)
+        logger.debug('Data successfully saved to %s', save_path)
     except FileNotFoundError:
         logger.error('File not found at the provided path: %s', save_path)
         raise
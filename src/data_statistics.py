@@ -0,0 +1,413 @@
+"""
+This module computes mergeable per-column statistics sketches (moments, fixed-bin
+histograms and approximate quantiles) chunk by chunk and measures drift against
+the statistics saved by a reference run.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.artifact_writer import ArtifactWriter
+
+logger = logging.getLogger(__name__)
+
+ALL_GROUPS = "all"
+
+
+def init_sketch(columns: List[str], lo: np.ndarray, hi: np.ndarray, bins: int) -> Dict:
+    """
+    Creates an empty sketch for the given columns over fixed histogram ranges.
+
+    Each column gets ``bins`` equal-width bins between ``lo`` and ``hi`` plus an
+    underflow and an overflow bin, so values outside the range are still counted.
+    """
+    k = len(columns)
+    return {
+        "columns": list(columns),
+        "bins": bins,
+        "lo": np.asarray(lo, dtype=float),
+        "hi": np.asarray(hi, dtype=float),
+        "count": np.zeros(k, dtype=np.int64),
+        "nulls": np.zeros(k, dtype=np.int64),
+        "infs": np.zeros(k, dtype=np.int64),
+        "mean": np.zeros(k),
+        "m2": np.zeros(k),
+        "min": np.full(k, np.inf),
+        "max": np.full(k, -np.inf),
+        "hist": np.zeros((k, bins + 2), dtype=np.int64),
+    }
+
+
+def _merge_moments(sketch: Dict, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+    """
+    Folds partial moments into the sketch using the parallel variance update.
+    """
+    total = sketch["count"] + count
+    safe_total = np.where(total > 0, total, 1)
+    delta = mean - sketch["mean"]
+    sketch["mean"] = sketch["mean"] + delta * count / safe_total
+    sketch["m2"] = sketch["m2"] + m2 + delta ** 2 * sketch["count"] * count / safe_total
+    sketch["count"] = total
+
+
+def update_sketch(sketch: Dict, values: np.ndarray) -> Dict:
+    """
+    Updates a sketch in place with a 2-D block of values (rows x sketch columns).
+
+    All statistics for all columns are computed in one vectorized pass over the block.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return sketch
+    nulls = np.isnan(values)
+    infs = np.isinf(values)
+    finite = ~(nulls | infs)
+    count = finite.sum(axis=0)
+    safe_count = np.where(count > 0, count, 1)
+    zeroed = np.where(finite, values, 0.0)
+    mean = zeroed.sum(axis=0) / safe_count
+    m2 = (np.where(finite, values - mean, 0.0) ** 2).sum(axis=0)
+
+    sketch["nulls"] += nulls.sum(axis=0)
+    sketch["infs"] += infs.sum(axis=0)
+    sketch["min"] = np.minimum(sketch["min"], np.where(finite, values, np.inf).min(axis=0))
+    sketch["max"] = np.maximum(sketch["max"], np.where(finite, values, -np.inf).max(axis=0))
+    _merge_moments(sketch, count, mean, m2)
+
+    bins = sketch["bins"]
+    width = (sketch["hi"] - sketch["lo"]) / bins
+    position = np.floor((zeroed - sketch["lo"]) / width)
+    index = np.clip(position, -1, bins).astype(np.int64) + 1
+    flat = index + np.arange(len(sketch["columns"])) * (bins + 2)
+    sketch["hist"] += np.bincount(
+        flat[finite], minlength=len(sketch["columns"]) * (bins + 2)
+    ).reshape(-1, bins + 2)
+    return sketch
+
+
+def merge_sketches(left: Dict, right: Dict) -> Dict:
+    """
+    Combines two sketches built over the same columns and histogram ranges.
+
+    Raises:
+        ValueError: If the sketches do not share columns and bin edges.
+    """
+    if (left["columns"] != right["columns"] or left["bins"] != right["bins"]
+            or not np.allclose(left["lo"], right["lo"]) or not np.allclose(left["hi"], right["hi"])):
+        logger.error("Cannot merge sketches with different columns or bin edges.")
+        raise ValueError("Cannot merge sketches with different columns or bin edges.")
+    merged = {key: (value.copy() if isinstance(value, np.ndarray) else value)
+              for key, value in left.items()}
+    merged["nulls"] = left["nulls"] + right["nulls"]
+    merged["infs"] = left["infs"] + right["infs"]
+    merged["min"] = np.minimum(left["min"], right["min"])
+    merged["max"] = np.maximum(left["max"], right["max"])
+    merged["hist"] = left["hist"] + right["hist"]
+    _merge_moments(merged, right["count"], right["mean"], right["m2"])
+    return merged
+
+
+def _bin_edges(lo: float, hi: float, bins: int, vmin: float, vmax: float) -> np.ndarray:
+    """
+    Returns the edges of every bin including the underflow and overflow bins.
+    """
+    inner = np.linspace(lo, hi, bins + 1)
+    return np.concatenate([[min(vmin, lo)], inner, [max(vmax, hi)]])
+
+
+def approximate_quantiles(hist: np.ndarray, edges: np.ndarray, quantiles: List[float]) -> List[float]:
+    """
+    Estimates quantiles by interpolating linearly within histogram bins.
+    """
+    total = hist.sum()
+    if total == 0:
+        return [float("nan")] * len(quantiles)
+    cumulative = np.concatenate([[0], np.cumsum(hist)])
+    estimates = []
+    for q in quantiles:
+        rank = q * total
+        i = min(int(np.searchsorted(cumulative, rank, side="left")), len(hist))
+        i = max(i, 1)
+        in_bin = hist[i - 1]
+        fraction = (rank - cumulative[i - 1]) / in_bin if in_bin else 0.0
+        estimates.append(float(edges[i - 1] + fraction * (edges[i] - edges[i - 1])))
+    return estimates
+
+
+def summarize_sketch(sketch: Dict, quantiles: List[float]) -> Dict[str, Dict]:
+    """
+    Converts a sketch into a plain per-column dictionary suitable for saving.
+    """
+    summary = {}
+    for i, column in enumerate(sketch["columns"]):
+        count = int(sketch["count"][i])
+        vmin = float(sketch["min"][i]) if count else float("nan")
+        vmax = float(sketch["max"][i]) if count else float("nan")
+        hist = sketch["hist"][i]
+        edges = _bin_edges(sketch["lo"][i], sketch["hi"][i], sketch["bins"],
+                           vmin if count else sketch["lo"][i], vmax if count else sketch["hi"][i])
+        summary[column] = {
+            "count": count,
+            "null_count": int(sketch["nulls"][i]),
+            "inf_count": int(sketch["infs"][i]),
+            "mean": float(sketch["mean"][i]) if count else float("nan"),
+            "std": float(np.sqrt(sketch["m2"][i] / (count - 1))) if count > 1 else float("nan"),
+            "min": vmin,
+            "max": vmax,
+            "quantiles": dict(zip(quantiles, approximate_quantiles(hist, edges, quantiles))),
+            "histogram": {
+                "lo": float(sketch["lo"][i]),
+                "hi": float(sketch["hi"][i]),
+                "counts": [int(c) for c in hist],
+            },
+        }
+    return summary
+
+
+def _finite_range(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the per-column min and max of the finite values (inf/-inf for columns without any).
+    """
+    finite = np.isfinite(values)
+    return (np.where(finite, values, np.inf).min(axis=0, initial=np.inf),
+            np.where(finite, values, -np.inf).max(axis=0, initial=-np.inf))
+
+
+def _initial_ranges(
+    observed_lo: np.ndarray,
+    observed_hi: np.ndarray,
+    columns: List[str],
+    config: Dict,
+    reference: Optional[Dict]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Chooses histogram ranges. The reference run's ranges come first so histograms
+    are directly comparable, then ranges declared under ``ranges`` in the config,
+    then the observed range padded by 10%.
+    """
+    reference_columns = (reference or {}).get(ALL_GROUPS, {})
+    ranges = config.get("ranges", {})
+    has_values = observed_lo <= observed_hi
+    first_lo = np.where(has_values, observed_lo, 0.0)
+    first_hi = np.where(has_values, observed_hi, 1.0)
+    pad = np.maximum((first_hi - first_lo) * 0.1, np.maximum(np.abs(first_hi), 1.0) * 1e-6)
+    lo, hi = first_lo - pad, first_hi + pad
+    for i, column in enumerate(columns):
+        if column in reference_columns:
+            lo[i] = reference_columns[column]["histogram"]["lo"]
+            hi[i] = reference_columns[column]["histogram"]["hi"]
+        elif column in ranges:
+            lo[i], hi[i] = ranges[column]
+    return lo, hi
+
+
+def _warn_overflow(statistics: Dict[str, Dict], threshold: float) -> None:
+    """
+    Warns about columns whose values mostly fall outside the histogram range, where
+    quantiles and drift scores are unreliable.
+    """
+    for group, columns in statistics.items():
+        for column, stats in columns.items():
+            counts = stats["histogram"]["counts"]
+            if stats["count"] and (counts[0] + counts[-1]) / stats["count"] > threshold:
+                logger.warning("%.1f%% of %s values (group %s) fall outside the histogram range "
+                               "[%g, %g]; declare a range for it under statistics.ranges.",
+                               100 * (counts[0] + counts[-1]) / stats["count"], column, group,
+                               stats["histogram"]["lo"], stats["histogram"]["hi"])
+
+
+def compute_statistics(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    config: Dict,
+    reference: Optional[Dict] = None
+) -> Dict[str, Dict]:
+    """
+    Computes per-group, per-column statistics in a single pass over the data.
+
+    Histogram ranges do not depend on the chunk order: they come from the reference
+    run, the configured ``ranges``, or, for a DataFrame, a min/max pre-scan of the
+    columns that have neither, which reads those columns a second time. Only for
+    an iterable of chunks without a reference or declared range is the first chunk's
+    range used.
+
+    :param data: A DataFrame or an iterable of DataFrame chunks
+    :param config: The statistics configuration (bins, chunk_size, quantiles, group_by,
+        ranges, overflow_warning)
+    :param reference: Statistics of a reference run whose histogram ranges should be reused
+    :return: Statistics keyed by group (plus ``all``) and column
+    """
+    bins = config.get("bins", 20)
+    chunk_size = config.get("chunk_size", 100000)
+    quantiles = config.get("quantiles", [0.05, 0.25, 0.5, 0.75, 0.95])
+    group_by = config.get("group_by", "class")
+
+    if isinstance(data, pd.DataFrame):
+        starts = range(0, max(len(data), 1), chunk_size)
+        columns = [c for c in data.select_dtypes("number").columns if c != group_by]
+        observed_lo, observed_hi = np.full(len(columns), np.inf), np.full(len(columns), -np.inf)
+        # Only columns without a reference or declared range need a min/max pre-scan
+        declared = set((reference or {}).get(ALL_GROUPS, {})) | set(config.get("ranges", {}))
+        scan = [i for i, c in enumerate(columns) if c not in declared]
+        if scan:
+            logger.info("Pre-scanning %d columns without a declared range.", len(scan))
+            for start in starts:
+                chunk = data[[columns[i] for i in scan]].iloc[start:start + chunk_size].to_numpy(dtype=float)
+                chunk_lo, chunk_hi = _finite_range(chunk)
+                observed_lo[scan] = np.minimum(observed_lo[scan], chunk_lo)
+                observed_hi[scan] = np.maximum(observed_hi[scan], chunk_hi)
+        lo, hi = _initial_ranges(observed_lo, observed_hi, columns, config, reference)
+        chunks = (data.iloc[start:start + chunk_size] for start in starts)
+    else:
+        columns, lo, hi = None, None, None
+        chunks = iter(data)
+
+    logger.info("Computing statistics in chunks of %d rows.", chunk_size)
+    sketches = {}
+    for chunk in chunks:
+        if columns is None:
+            columns = [c for c in chunk.select_dtypes("number").columns if c != group_by]
+            lo, hi = _initial_ranges(*_finite_range(chunk[columns].to_numpy(dtype=float)),
+                                     columns, config, reference)
+        values = chunk[columns].to_numpy(dtype=float)
+        if group_by in chunk:
+            labels = chunk[group_by].to_numpy()
+            for label in pd.unique(labels):
+                key = f"{label:g}" if isinstance(label, (int, float, np.number)) else str(label)
+                if key not in sketches:
+                    sketches[key] = init_sketch(columns, lo, hi, bins)
+                update_sketch(sketches[key], values[labels == label])
+        else:
+            sketches.setdefault(ALL_GROUPS, init_sketch(columns, lo, hi, bins))
+            update_sketch(sketches[ALL_GROUPS], values)
+
+    if not sketches:
+        logger.warning("No data to compute statistics from.")
+        return {}
+    if ALL_GROUPS not in sketches:
+        groups = list(sketches.values())
+        total = groups[0]
+        for sketch in groups[1:]:
+            total = merge_sketches(total, sketch)
+        sketches[ALL_GROUPS] = total
+    logger.info("Statistics computed for %d columns and %d groups.", len(columns), len(sketches))
+    statistics = {group: summarize_sketch(sketch, quantiles) for group, sketch in sketches.items()}
+    _warn_overflow(statistics, config.get("overflow_warning", 0.05))
+    return statistics
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray, epsilon: float = 1e-4) -> float:
+    """
+    Computes the PSI between two histograms over the same bins.
+    """
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    expected = np.clip(expected / max(expected.sum(), 1), epsilon, None)
+    actual = np.clip(actual / max(actual.sum(), 1), epsilon, None)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def ks_statistic(expected: np.ndarray, actual: np.ndarray) -> float:
+    """
+    Approximates the two-sample Kolmogorov-Smirnov statistic at the histogram bin edges.
+    """
+    expected = np.cumsum(expected) / max(np.sum(expected), 1)
+    actual = np.cumsum(actual) / max(np.sum(actual), 1)
+    return float(np.max(np.abs(expected - actual)))
+
+
+def compute_drift(current: Dict, reference: Dict, config: Dict) -> Dict[str, Dict]:
+    """
+    Compares current statistics against a reference run's statistics.
+
+    Only the saved histograms are used, so the reference data is never reloaded.
+
+    :param current: Statistics returned by ``compute_statistics``
+    :param reference: Statistics loaded from the reference run
+    :param config: The statistics configuration (psi_threshold, ks_threshold)
+    :return: PSI, KS and a drift flag keyed by group and column
+    """
+    psi_threshold = config.get("psi_threshold", 0.2)
+    ks_threshold = config.get("ks_threshold", 0.1)
+    drift = {}
+    for group, columns in current.items():
+        if group not in reference:
+            logger.warning("Group %s is missing from the reference statistics.", group)
+            continue
+        for column, stats in columns.items():
+            ref = reference[group].get(column)
+            if ref is None:
+                logger.warning("Column %s is missing from the reference statistics.", column)
+                continue
+            if (ref["histogram"]["lo"], ref["histogram"]["hi"], len(ref["histogram"]["counts"])) != (
+                    stats["histogram"]["lo"], stats["histogram"]["hi"], len(stats["histogram"]["counts"])):
+                logger.warning("Histogram bins for %s differ from the reference; skipping.", column)
+                continue
+            psi = population_stability_index(ref["histogram"]["counts"], stats["histogram"]["counts"])
+            ks = ks_statistic(ref["histogram"]["counts"], stats["histogram"]["counts"])
+            drifted = psi > psi_threshold or ks > ks_threshold
+            if drifted:
+                logger.warning("Drift detected for %s (group %s): PSI=%.4f, KS=%.4f",
+                               column, group, psi, ks)
+            drift.setdefault(group, {})[column] = {"psi": psi, "ks": ks, "drift": drifted}
+    return drift
+
+
+def save_statistics(statistics: Dict, statistics_path: Path) -> None:
+    """
+    Save statistics or drift results to a YAML file.
+
+    Args:
+        statistics: The statistics dictionary.
+        statistics_path: The path to save the YAML file.
+    """
+    try:
+        with open(statistics_path, "w") as file:
+            yaml.dump(statistics, file, default_flow_style=None)
+        logger.debug("Statistics saved to %s", statistics_path)
+    except Exception as e:
+        logger.error("An error occurred while saving statistics to %s: %s", statistics_path, e)
+        raise
+
+
+def load_statistics(statistics_path: Path) -> Dict:
+    """
+    Load statistics previously written by ``save_statistics``.
+    """
+    with open(statistics_path, "r") as file:
+        return yaml.load(file, Loader=yaml.FullLoader) or {}
+
+
+def profile_data(data: pd.DataFrame, stage: str, config: Dict, artifacts: Path,
+                 writer: Optional[ArtifactWriter] = None) -> Dict:
+    """
+    Computes and saves statistics for a pipeline stage, and drift against the
+    reference run configured under ``reference`` if there is one.
+
+    :param data: The data produced by the stage
+    :param stage: The stage name used in the artifact file names, e.g. ``raw``
+    :param config: The statistics configuration
+    :param artifacts: The run's artifact directory
+    :param writer: Optional background writer; if given, the files are saved asynchronously
+    :return: The computed statistics
+    """
+    reference = None
+    reference_dir = config.get("reference")
+    if reference_dir:
+        reference_path = Path(reference_dir) / f"statistics_{stage}.yaml"
+        try:
+            reference = load_statistics(reference_path)
+            logger.info("Loaded reference statistics from %s", reference_path)
+        except FileNotFoundError:
+            logger.warning("Reference statistics not found at %s", reference_path)
+
+    save = save_statistics if writer is None else lambda obj, path: writer.submit(save_statistics, obj, path)
+    statistics = compute_statistics(data, config, reference)
+    save(statistics, artifacts / f"statistics_{stage}.yaml")
+    if reference:
+        save(compute_drift(statistics, reference, config), artifacts / f"drift_{stage}.yaml")
+    return statistics
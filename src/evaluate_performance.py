@@ -1,12 +1,19 @@
+import logging
 import yaml
 from pathlib import Path
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Any, Dict
 from sklearn.metrics import roc_auc_score, confusion_matrix, accuracy_score, classification_report
 
+logger = logging.getLogger(__name__)
+
 def compute_metrics(y_true: pd.Series, y_pred_proba: pd.Series, y_pred: pd.Series) -> Dict:
     metrics = {}
-    metrics["roc_auc_score"] = roc_auc_score(y_true, y_pred_proba)
+    if y_true.nunique() > 1:
+        metrics["roc_auc_score"] = roc_auc_score(y_true, y_pred_proba)
+    else:
+        logger.warning("Only one class in y_true; skipping roc_auc_score.")
     metrics["confusion_matrix"] = confusion_matrix(y_true, y_pred).tolist()
     metrics["accuracy_score"] = accuracy_score(y_true, y_pred)
     metrics["classification_report"] = classification_report(y_true, y_pred, output_dict=True)
@@ -19,6 +26,15 @@ def evaluate_performance(scores: pd.DataFrame, config: Dict) -> Dict:
     metrics = compute_metrics(y_true, y_pred_proba, y_pred)
     return metrics
 
+def to_builtin(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
 def save_metrics(metrics: Dict, metrics_path: Path) -> None:
     with open(metrics_path, "w") as file:
-        yaml.dump(metrics, file)
+        yaml.dump(to_builtin(metrics), file)
@@ -18,7 +18,7 @@ def log_transform(data: pd.DataFrame, column: str, new_column: str) -> pd.DataFr
     if (data[column] <= 0).any():
         logger.error("All values in the column must be positive.")
         raise ValueError("All values in the column must be positive.")
-    data[new_column] = data[column].apply(np.log)
+    data[new_column] = np.log(data[column])
     return data
 
 
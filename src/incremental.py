@@ -0,0 +1,331 @@
+"""
+This module supports incremental retraining: it detects the raw lines appended
+since the last run, keeps a growing dataset of their features and grows the
+stored random forest with trees trained on the new rows, retiring old trees.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.base import BaseEstimator
+
+import src.artifact_writer as aw
+import src.create_dataset as cd
+import src.train_model as tm
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "state.yaml"
+DATASET_FILE = "dataset.csv"
+# The model and samples are written under a new name on every update and only
+# become current when the state naming them is saved
+VERSIONED_FILES = {"model_file": "model-{}.pkl", "reservoir_file": "reservoir-{}.csv",
+                   "holdout_file": "holdout-{}.csv"}
+FINGERPRINT_BYTES = 65536
+
+
+def _fingerprint(f, start: int, end: int) -> str:
+    f.seek(start)
+    return hashlib.sha256(f.read(end - start)).hexdigest()
+
+
+def load_state(state_dir: Path) -> Dict:
+    """
+    Load the incremental state, or an empty state if there is none yet.
+
+    Args:
+        state_dir: The directory holding the state, model and dataset.
+
+    Returns:
+        The state dictionary.
+    """
+    state_path = Path(state_dir) / STATE_FILE
+    if not state_path.exists():
+        logger.info("No incremental state found in %s; starting from scratch.", state_dir)
+        return {}
+    with open(state_path, "r") as f:
+        return yaml.load(f, Loader=yaml.FullLoader) or {}
+
+
+def save_state(state: Dict, state_path: Path) -> None:
+    """
+    Save the incremental state to a YAML file.
+
+    Args:
+        state: The state dictionary.
+        state_path: The path to save the YAML file.
+    """
+    with open(state_path, "w") as file:
+        yaml.dump(state, file)
+
+
+def read_new_lines(raw_path: Path, state: Dict) -> Tuple[List[str], int, int]:
+    """
+    Read the complete lines appended to the raw file since the state was saved.
+
+    The previously consumed prefix is recognised by its length and by hashes of
+    its first and last FINGERPRINT_BYTES bytes, so only the new bytes are read. If
+    the prefix no longer matches, the file was rewritten and everything is re-read.
+
+    Args:
+        raw_path: The raw data file.
+        state: The incremental state.
+
+    Returns:
+        The new lines, the line number of the first new line, and the byte offset
+        just past the last complete new line.
+    """
+    offset = state.get("offset", 0)
+    with open(raw_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset and (size < offset
+                       or _fingerprint(f, 0, min(offset, FINGERPRINT_BYTES)) != state.get("head_sha256")
+                       or _fingerprint(f, max(offset - FINGERPRINT_BYTES, 0), offset) != state.get("tail_sha256")):
+            logger.warning("%s no longer matches the consumed data; re-reading it in full.", raw_path)
+            state.clear()
+            offset = 0
+        f.seek(offset)
+        new_bytes = f.read()
+
+    # Leave a trailing partial line for the next run
+    complete = new_bytes[:new_bytes.rfind(b"\n") + 1]
+    lines = complete.decode("utf-8").splitlines(keepends=True)
+    logger.info("Read %d new lines (%d bytes) from %s", len(lines), len(complete), raw_path)
+    return lines, state.get("line_count", 0), offset + len(complete)
+
+
+def load_reservoir(state_dir: Path, name: Optional[str]) -> pd.DataFrame:
+    """
+    Load a per-class sample of past rows, or an empty DataFrame if there is none yet.
+    The state's reservoir_file samples past training rows and holdout_file past
+    testing rows.
+    """
+    if name is None:
+        return pd.DataFrame()
+    reservoir_path = Path(state_dir) / name
+    if not reservoir_path.exists():
+        return pd.DataFrame()
+    try:
+        return pd.read_csv(reservoir_path)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def update_reservoir(reservoir: pd.DataFrame, rows: pd.DataFrame, seen: Dict, size: int) -> pd.DataFrame:
+    """
+    Keep a uniform sample of at most size rows per class over every row seen so far.
+
+    Args:
+        reservoir: The current sample.
+        rows: The new rows.
+        seen: The number of rows seen per class; updated in place.
+        size: The maximum number of rows kept per class.
+
+    Returns:
+        The updated sample.
+    """
+    rng = np.random.default_rng()
+    labels = rows["class"].unique()
+    parts = [reservoir[~reservoir["class"].isin(labels)]] if len(reservoir) else []
+    for label in labels:
+        group = rows[rows["class"] == label]
+        current = reservoir[reservoir["class"] == label] if len(reservoir) else rows.iloc[0:0]
+        n_seen = seen.get(float(label), 0)
+        fill = max(min(size - len(current), len(group)), 0)
+        current = pd.concat([current, group.iloc[:fill]], ignore_index=True)
+        rest = group.iloc[fill:]
+        if len(rest):
+            # Row i of the stream replaces a random slot with probability size / i
+            stream_index = n_seen + fill + np.arange(1, len(rest) + 1)
+            slots = (rng.random(len(rest)) * stream_index).astype(np.int64)
+            accepted = slots < size
+            current.iloc[slots[accepted]] = rest[accepted].to_numpy()
+        seen[float(label)] = n_seen + len(group)
+        parts.append(current)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _retire_trees(model: BaseEstimator, generations: List[int], config: Dict) -> List[int]:
+    """
+    Drop the oldest trees according to the configured retirement policy.
+    """
+    keep = len(generations)
+    max_generations = config.get("max_generations")
+    if max_generations:
+        newest = generations[-1]
+        keep = min(keep, sum(1 for g in generations if newest - g < max_generations))
+    max_trees = config.get("max_trees")
+    if max_trees:
+        keep = min(keep, max_trees)
+    retired = len(generations) - keep
+    if retired:
+        model.estimators_ = model.estimators_[retired:]
+        model.n_estimators = len(model.estimators_)
+        logger.info("Retired the %d oldest trees; %d trees remain.", retired, keep)
+    return generations[retired:]
+
+
+def split_rows(rows: pd.DataFrame, test_size: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split rows into training and testing sets like train_model. Batches too small
+    to leave rows on both sides are used for training only.
+    """
+    n_test = math.ceil(test_size * len(rows))
+    if n_test == 0 or n_test >= len(rows):
+        logger.info("Only %d rows; using all of them for training.", len(rows))
+        return rows, rows.iloc[0:0]
+    x_train, x_test, y_train, y_test = tm.split_data(rows.drop(columns="class"), rows["class"], test_size)
+    return pd.concat([x_train, y_train], axis=1), pd.concat([x_test, y_test], axis=1)
+
+
+def train_incremental(
+    train: pd.DataFrame,
+    test: pd.DataFrame,
+    state: Dict,
+    state_dir: Path,
+    train_config: Dict,
+    config: Dict
+) -> Tuple[BaseEstimator, pd.DataFrame, pd.DataFrame]:
+    """
+    Grow the stored forest with trees trained on the new rows, or train a new
+    forest if there is no stored model yet.
+
+    New trees are trained on the new training rows together with the stored
+    per-class sample of past training rows, so they see every class even when
+    the new rows come from a single class. The new testing rows are joined by the
+    per-class sample of past testing rows, which no tree has been trained on.
+
+    Args:
+        train: The new training rows, from split_rows.
+        test: The new testing rows, from split_rows.
+        state: The incremental state; its tree generations are updated in place.
+        state_dir: The directory holding the state, model and dataset.
+        train_config: The train_model configuration dictionary.
+        config: The incremental configuration (trees_per_update, max_trees, max_generations).
+
+    Returns:
+        Tuple[BaseEstimator, pd.DataFrame, pd.DataFrame]: The model, training set, and testing set.
+    """
+    if not state.get("generations") or not state.get("model_file"):
+        model = tm.train_random_forest(train.drop(columns="class"), train["class"],
+                                       train_config["n_estimators"], train_config["max_depth"],
+                                       train_config["initial_features"])
+        model.set_params(warm_start=True)
+        state["generations"] = [0] * len(model.estimators_)
+        return model, train, test
+
+    model = tm.load_model(Path(state_dir) / state["model_file"])
+    test = pd.concat([test, load_reservoir(state_dir, state.get("holdout_file"))], ignore_index=True)
+    recent = pd.concat([train, load_reservoir(state_dir, state.get("reservoir_file"))], ignore_index=True)
+    if set(recent["class"].unique()) != set(model.classes_):
+        logger.warning("Recent rows do not cover all classes %s; keeping the existing trees only.",
+                       model.classes_.tolist())
+        return model, recent, test
+
+    generation = state["generations"][-1] + 1
+    trees = config.get("trees_per_update", 10)
+    logger.info("Adding %d trees trained on %d new and %d sampled past rows.",
+                trees, len(train), len(recent) - len(train))
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees)
+    model.fit(recent[train_config["initial_features"]], recent["class"])
+    state["generations"] = _retire_trees(model, state["generations"] + [generation] * trees, config)
+    return model, recent, test
+
+
+def commit_update(
+    state: Dict,
+    state_dir: Path,
+    model: BaseEstimator,
+    train: pd.DataFrame,
+    test: pd.DataFrame,
+    raw_path: Path,
+    offset: int,
+    line_count: int,
+    config: Dict
+) -> None:
+    """
+    Persist the grown model, append the new rows to the stored dataset and record
+    how far the raw file has been consumed.
+
+    The new training and testing rows are sampled into separate reservoirs, so
+    rows used to evaluate later updates were never used to train any tree.
+
+    The state is written last and atomically, and is the commit point. The model
+    and samples are written to new files that the state then names, and the
+    dataset is first truncated to the size recorded in the state, so an
+    interrupted run leaves the previous update intact.
+
+    Args:
+        state: The incremental state.
+        state_dir: The directory holding the state, model and dataset.
+        model: The updated model.
+        train: The new training rows.
+        test: The new testing rows.
+        raw_path: The raw data file.
+        offset: The byte offset just past the consumed lines.
+        line_count: The total number of raw lines consumed.
+        config: The incremental configuration (reservoir_rows).
+    """
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    previous = {key: state.get(key) for key in VERSIONED_FILES}
+    version = uuid.uuid4().hex[:8]
+    files = {key: name.format(version) for key, name in VERSIONED_FILES.items()}
+    aw.write_atomic(tm.save_model, model, state_dir / files["model_file"])
+
+    dataset_path = state_dir / DATASET_FILE
+    dataset_bytes = state.get("dataset_bytes", 0)
+    with open(dataset_path, "ab") as f:
+        f.truncate(dataset_bytes)
+    pd.concat([train, test]).to_csv(dataset_path, mode="a", header=dataset_bytes == 0, index=False)
+
+    size = config.get("reservoir_rows", 1000)
+    for key, rows, counts in [("reservoir_file", train, "class_counts"), ("holdout_file", test, "holdout_counts")]:
+        seen = dict(state.get(counts, {}))
+        reservoir = load_reservoir(state_dir, previous[key]) if dataset_bytes else pd.DataFrame()
+        if len(rows):
+            reservoir = update_reservoir(reservoir, rows, seen, size)
+        aw.write_atomic(cd.save_dataset, reservoir, state_dir / files[key])
+        state[counts] = seen
+
+    state.update(files)
+    state["dataset_bytes"] = dataset_path.stat().st_size
+    advance_offset(state, state_dir, raw_path, offset, line_count)
+
+    # Remove the files replaced by this update and any left by interrupted runs
+    for key, name in VERSIONED_FILES.items():
+        for path in state_dir.glob(name.format("*")):
+            if path.name != files[key]:
+                path.unlink()
+
+
+def advance_offset(state: Dict, state_dir: Path, raw_path: Path, offset: int, line_count: int) -> None:
+    """
+    Record how far the raw file has been consumed, without changing the model or
+    dataset, e.g. when every new row was quarantined.
+
+    Args:
+        state: The incremental state.
+        state_dir: The directory holding the state, model and dataset.
+        raw_path: The raw data file.
+        offset: The byte offset just past the consumed lines.
+        line_count: The total number of raw lines consumed.
+    """
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    with open(raw_path, "rb") as f:
+        state["head_sha256"] = _fingerprint(f, 0, min(offset, FINGERPRINT_BYTES))
+        state["tail_sha256"] = _fingerprint(f, max(offset - FINGERPRINT_BYTES, 0), offset)
+    state["offset"] = offset
+    state["line_count"] = line_count
+    aw.write_atomic(save_state, state, state_dir / STATE_FILE)
+    logger.info("Incremental state saved to %s (%d trees, %d raw lines consumed)",
+                state_dir, len(state.get("generations", [])), line_count)
@@ -0,0 +1,411 @@
+"""
+This module maintains an embedded SQLite index over the pipeline's run directories
+so experiments can be looked up and compared without re-parsing every run.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+TIMINGS_FILE = "timings.yaml"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    name TEXT,
+    version TEXT,
+    config_hash TEXT,
+    signature REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    num_value REAL,
+    PRIMARY KEY (run_id, key)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (run_id, path)
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL,
+    PRIMARY KEY (run_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_params_key_num ON params (key, num_value);
+CREATE INDEX IF NOT EXISTS idx_metrics_name_value ON metrics (name, value);
+CREATE INDEX IF NOT EXISTS idx_runs_config_hash ON runs (config_hash);
+"""
+
+_FILTER_PATTERN = re.compile(r"^\s*([\w.\- ]+?)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$")
+
+
+@contextlib.contextmanager
+def timed(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """
+    Records the wall-clock duration of the enclosed block under the given stage name.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+        logger.debug("Stage %s took %.3f seconds", stage, timings[stage])
+
+
+def save_timings(timings: Dict[str, float], timings_path: Path) -> None:
+    """
+    Save stage timings to a YAML file alongside the other run artifacts.
+
+    Args:
+        timings: Mapping of stage name to duration in seconds.
+        timings_path: The path to save the YAML file.
+    """
+    with open(timings_path, "w") as file:
+        yaml.dump({stage: float(seconds) for stage, seconds in timings.items()}, file)
+
+
+def config_hash(config: Dict) -> str:
+    """
+    Compute a stable hash of a configuration dictionary, independent of key order.
+    """
+    canonical = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def connect(registry_path: Path) -> sqlite3.Connection:
+    """
+    Open the registry database, creating the schema if needed.
+
+    Args:
+        registry_path: Location of the SQLite file.
+
+    Returns:
+        An open connection to the registry.
+    """
+    registry_path = Path(registry_path)
+    registry_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(registry_path))
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _flatten(values: Dict, prefix: str = "") -> Dict[str, Any]:
+    """
+    Flatten nested dictionaries into dotted keys, keeping only scalar leaves.
+    """
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (bool, int, float, str)) or value is None:
+            flat[name] = value
+    return flat
+
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _RunLoader(yaml.FullLoader):
+    """
+    FullLoader that also reads the numpy scalars older runs dumped into metrics.yaml.
+    """
+
+
+def _construct_numpy_dtype(loader: yaml.Loader, suffix: str, node: yaml.Node) -> str:
+    return loader.construct_mapping(node, deep=True)["args"][0]
+
+
+def _construct_numpy_scalar(loader: yaml.Loader, suffix: str, node: yaml.Node) -> Any:
+    dtype, data = loader.construct_sequence(node, deep=True)
+    return np.frombuffer(data, dtype=dtype)[0].item()
+
+
+for _module in ("numpy.core.multiarray", "numpy._core.multiarray"):
+    _RunLoader.add_multi_constructor(f"tag:yaml.org,2002:python/object/apply:{_module}.scalar",
+                                     _construct_numpy_scalar)
+_RunLoader.add_multi_constructor("tag:yaml.org,2002:python/object/apply:numpy.dtype",
+                                 _construct_numpy_dtype)
+
+
+def _load_yaml(path: Path) -> Dict:
+    if not path.exists():
+        return {}
+    with open(path, "r") as f:
+        try:
+            return yaml.load(f, Loader=_RunLoader) or {}
+        except yaml.error.YAMLError as e:
+            logger.warning("Could not parse %s: %s", path, e)
+            return {}
+
+
+def _signature(run_dir: Path) -> float:
+    """
+    Fingerprint of a run directory used to decide whether it needs re-indexing.
+    """
+    files = [run_dir / "config.yaml", run_dir / "metrics.yaml", run_dir / TIMINGS_FILE]
+    return max((f.stat().st_mtime for f in files if f.exists()), default=0.0)
+
+
+def index_run(conn: sqlite3.Connection, run_dir: Path, metrics: Optional[Dict] = None) -> str:
+    """
+    Insert or replace a single run directory in the registry.
+
+    Args:
+        conn: An open registry connection.
+        run_dir: The run directory containing config.yaml and, optionally,
+            metrics.yaml, timings.yaml and other artifacts.
+        metrics: The run's metrics, if already in memory; otherwise metrics.yaml is read.
+
+    Returns:
+        The run id under which the run was indexed.
+    """
+    run_dir = Path(run_dir)
+    run_id = run_dir.name
+    config = _load_yaml(run_dir / "config.yaml")
+    if metrics is None:
+        metrics = _load_yaml(run_dir / "metrics.yaml")
+    timings = _load_yaml(run_dir / TIMINGS_FILE)
+    run_config = config.get("run_config", {})
+
+    params = _flatten(config.get("train_model", {}))
+    metric_values = {name: _as_number(value) for name, value in _flatten(metrics).items()}
+    artifact_sizes = [
+        (str(f.relative_to(run_dir)), f.stat().st_size)
+        for f in run_dir.glob("**/*") if f.is_file()
+    ]
+
+    with conn:
+        conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        conn.execute(
+            "INSERT INTO runs (run_id, path, name, version, config_hash, signature) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, str(run_dir.resolve()), run_config.get("name"),
+             str(run_config.get("version", "")), config_hash(config), _signature(run_dir)),
+        )
+        conn.executemany(
+            "INSERT INTO params (run_id, key, value, num_value) VALUES (?, ?, ?, ?)",
+            [(run_id, key, str(value), _as_number(value)) for key, value in params.items()],
+        )
+        conn.executemany(
+            "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+            [(run_id, name, value) for name, value in metric_values.items()
+             if value is not None],
+        )
+        conn.executemany(
+            "INSERT INTO artifacts (run_id, path, size) VALUES (?, ?, ?)",
+            [(run_id, path, size) for path, size in artifact_sizes],
+        )
+        conn.executemany(
+            "INSERT INTO timings (run_id, stage, seconds) VALUES (?, ?, ?)",
+            [(run_id, stage, float(seconds)) for stage, seconds in timings.items()],
+        )
+    logger.debug("Indexed run %s from %s", run_id, run_dir)
+    return run_id
+
+
+def rebuild_index(conn: sqlite3.Connection, runs_root: Path) -> Tuple[int, int, int]:
+    """
+    Incrementally bring the registry in line with the run directories on disk.
+
+    Runs whose config, metrics and timings are unchanged since they were last
+    indexed are skipped; runs whose directories have disappeared are removed.
+
+    Args:
+        conn: An open registry connection.
+        runs_root: The directory holding one sub-directory per run.
+
+    Returns:
+        The number of runs indexed, skipped and removed.
+    """
+    runs_root = Path(runs_root)
+    known = dict(conn.execute("SELECT run_id, signature FROM runs"))
+    seen = set()
+    indexed = skipped = 0
+    for run_dir in sorted(p for p in runs_root.iterdir() if (p / "config.yaml").exists()):
+        seen.add(run_dir.name)
+        if known.get(run_dir.name) == _signature(run_dir):
+            skipped += 1
+            continue
+        index_run(conn, run_dir)
+        indexed += 1
+
+    removed = [run_id for run_id in known if run_id not in seen]
+    with conn:
+        conn.executemany("DELETE FROM runs WHERE run_id = ?", [(r,) for r in removed])
+    logger.info("Registry rebuilt: %d indexed, %d unchanged, %d removed",
+                indexed, skipped, len(removed))
+    return indexed, skipped, len(removed)
+
+
+def parse_filter(expression: str) -> Tuple[str, str, str]:
+    """
+    Parse a filter expression such as ``max_depth<=5`` into key, operator and value.
+
+    Raises:
+        ValueError: If the expression is not of the form ``<key><op><value>``.
+    """
+    match = _FILTER_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Invalid filter expression: {expression!r}")
+    key, operator, value = match.groups()
+    return key, "=" if operator == "==" else operator, value
+
+
+def query_runs(
+    conn: sqlite3.Connection,
+    metric: str,
+    filters: Optional[List[str]] = None,
+    limit: int = 10,
+    ascending: bool = False
+) -> List[Tuple[str, float, str]]:
+    """
+    Rank runs by a metric, optionally restricted by hyperparameter filters.
+
+    Args:
+        conn: An open registry connection.
+        metric: The metric name to rank by, e.g. ``roc_auc_score``.
+        filters: Expressions such as ``max_depth<=5`` applied to indexed parameters.
+        limit: Maximum number of runs to return.
+        ascending: Rank lowest first instead of highest first.
+
+    Returns:
+        A list of (run_id, metric value, run path) tuples.
+    """
+    clauses, args = [], [metric]
+    for expression in filters or []:
+        key, operator, value = parse_filter(expression)
+        number = _as_number(value)
+        column, operand = ("num_value", number) if number is not None else ("value", value)
+        clauses.append(
+            f"r.run_id IN (SELECT run_id FROM params WHERE key = ? AND {column} {operator} ?)"
+        )
+        args.extend([key, operand])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = "ASC" if ascending else "DESC"
+    sql = (
+        "SELECT r.run_id, m.value, r.path FROM runs r "
+        "JOIN metrics m ON m.run_id = r.run_id AND m.name = ? "
+        f"{where} ORDER BY m.value {order} LIMIT ?"
+    )
+    return conn.execute(sql, args + [limit]).fetchall()
+
+
+def compare_runs(conn: sqlite3.Connection, run_ids: List[str]) -> Dict[str, Dict[str, Dict]]:
+    """
+    Collect parameters, metrics, timings and artifact sizes for several runs.
+
+    Args:
+        conn: An open registry connection.
+        run_ids: The runs to compare.
+
+    Returns:
+        A mapping of section name to ``{row name: {run_id: value}}``.
+    """
+    sections = {
+        "config_hash": "SELECT run_id, 'config_hash', substr(config_hash, 1, 12) FROM runs",
+        "params": "SELECT run_id, key, value FROM params",
+        "metrics": "SELECT run_id, name, value FROM metrics",
+        "timings": "SELECT run_id, stage, seconds FROM timings",
+        "artifacts": "SELECT run_id, path, size FROM artifacts",
+    }
+    placeholders = ", ".join("?" for _ in run_ids)
+    comparison = {}
+    for section, sql in sections.items():
+        rows = conn.execute(f"{sql} WHERE run_id IN ({placeholders})", run_ids)
+        table = {}
+        for run_id, name, value in rows:
+            table.setdefault(name, {})[run_id] = value
+        comparison[section] = table
+    return comparison
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def _print_comparison(comparison: Dict[str, Dict[str, Dict]], run_ids: List[str],
+                      only_diff: bool) -> None:
+    width = max([len(r) for r in run_ids] + [12])
+    for section, table in comparison.items():
+        rows = {
+            name: values for name, values in table.items()
+            if not only_diff or len({values.get(r) for r in run_ids}) > 1
+        }
+        if not rows:
+            continue
+        print(f"[{section}]")
+        print(" " * 40 + "".join(f"{r:>{width + 2}}" for r in run_ids))
+        for name in sorted(rows):
+            cells = "".join(f"{_format_cell(rows[name].get(r)):>{width + 2}}" for r in run_ids)
+            print(f"{name[:40]:<40}{cells}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and compare indexed pipeline runs")
+    parser.add_argument("--registry", default="runs/registry.sqlite",
+                        help="Path to the registry database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Index new or changed run directories")
+    rebuild_parser.add_argument("--runs", default="runs", help="Directory containing the runs")
+
+    query_parser = subparsers.add_parser("query", help="Rank runs by a metric")
+    query_parser.add_argument("--metric", default="roc_auc_score", help="Metric to rank by")
+    query_parser.add_argument("--where", action="append", default=[],
+                              help="Parameter filter such as 'max_depth<=5'; repeatable")
+    query_parser.add_argument("--limit", type=int, default=10, help="Number of runs to show")
+    query_parser.add_argument("--ascending", action="store_true", help="Lowest values first")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare runs side by side")
+    compare_parser.add_argument("run_ids", nargs="+", help="Run ids (directory names)")
+    compare_parser.add_argument("--all", action="store_true",
+                                help="Show rows that are identical across runs")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    connection = connect(Path(args.registry))
+
+    if args.command == "rebuild":
+        rebuild_index(connection, Path(args.runs))
+    elif args.command == "query":
+        for run, value, path in query_runs(connection, args.metric, args.where,
+                                           args.limit, args.ascending):
+            print(f"{run}\t{value:.6f}\t{path}")
+    elif args.command == "compare":
+        _print_comparison(compare_runs(connection, args.run_ids), args.run_ids, not args.all)
+    connection.close()
@@ -72,10 +72,10 @@ def save_scores(scores: pd.DataFrame, scores_path: Path) -> None:
     Returns:
         None
     """
-    logger.info("Saving scores to %s", scores_path)
+    logger.debug("Saving scores to %s", scores_path)
     try:
         scores.to_csv(scores_path, index=False)
-        logger.info("Scores saved to %s", scores_path)
+        logger.debug("Scores saved to %s", scores_path)
     except Exception as e:
         logger.error("An error occurred while saving scores to %s: %s", scores_path, e)
         raise
@@ -80,26 +80,6 @@ def train_model(data: pd.DataFrame, config: dict) -> Tuple[BaseEstimator, pd.Dat
 
     return model, train, test
 
-def save_data(train: pd.DataFrame, test: pd.DataFrame, artifacts: Path) -> None:
-    """
-    Save the training and testing sets to CSV files.
-
-    Args:
-        train (pd.DataFrame): The training set.
-        test (pd.DataFrame): The testing set.
-        artifacts (Path): The directory to save the CSV files in.
-
-    Returns:
-        None
-    """
-    logger.info("Saving train and test data.")
-    try:
-        train.to_csv(artifacts / "train.csv", index=False)
-        test.to_csv(artifacts / "test.csv", index=False)
-    except Exception as e:
-        logging.error("An error occurred while saving data: %s", str(e))
-        raise
-
 def save_model(model: sklearn.base.BaseEstimator, model_path: Path) -> None:
     """
     Save a trained model to a file.
@@ -115,7 +95,28 @@ def save_model(model: sklearn.base.BaseEstimator, model_path: Path) -> None:
     try:
         with open(model_path, "wb") as f:
             pickle.dump(model, f)
-        logger.info("Model saved to %s", model_path)
+        logger.debug("Model saved to %s", model_path)
     except Exception as e:
         logger.exception("Error while saving the model to %s", model_path)
         raise e
+
+def load_model(model_path: Path) -> sklearn.base.BaseEstimator:
+    """
+    Load a trained model saved by save_model.
+
+    Args:
+        model_path: The path of the model file.
+
+    Returns:
+        The trained model object.
+
+    Raises:
+        Exception: If there is an error while loading the model.
+    """
+    logger.info("Loading the model from %s", model_path)
+    try:
+        with open(model_path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.exception("Error while loading the model from %s", model_path)
+        raise e
@@ -0,0 +1,157 @@
+"""
+This module validates the raw dataset and the inputs to feature generation in a
+single vectorized pass, either failing fast or quarantining the offending rows.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FAIL_FAST = "fail_fast"
+QUARANTINE = "quarantine"
+
+
+def build_rules(columns: List[str], feature_config: Dict, config: Dict) -> Dict[str, np.ndarray]:
+    """
+    Derives per-column validation rules from the dataset columns, the feature
+    generation configuration and any declared ranges.
+
+    :param columns: The raw columns that must be present in the dataset
+    :param feature_config: The generate_features configuration
+    :param config: The validate_data configuration
+    :return: Column names and their lower/upper bounds, positivity and non-zero flags
+    """
+    positive = set(feature_config.get("log_transform", {}).values())
+    nonzero = {conf.get("mean_col") for conf in feature_config.get("calculate_norm_range", {}).values()}
+    ranges = config.get("ranges", {})
+
+    checked = list(columns)
+    for section in feature_config.values():
+        if not isinstance(section, dict):
+            continue
+        for conf in section.values():
+            inputs = conf.values() if isinstance(conf, dict) else [conf]
+            checked.extend(c for c in inputs if c and c not in checked)
+    checked.extend(c for c in ranges if c not in checked)
+
+    bounds = [ranges.get(c) or [None, None] for c in checked]
+    return {
+        "columns": checked,
+        "lower": np.array([-np.inf if low is None else low for low, _ in bounds], dtype=float),
+        "upper": np.array([np.inf if high is None else high for _, high in bounds], dtype=float),
+        "positive": np.array([c in positive for c in checked]),
+        "nonzero": np.array([c in nonzero for c in checked]),
+    }
+
+
+def find_violations(data: pd.DataFrame, rules: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Evaluates every rule for every checked column in one pass over the data.
+
+    :param data: The dataset to check
+    :param rules: Rules returned by ``build_rules``
+    :return: A boolean (rows x columns) violation matrix per rule
+    """
+    values = data[rules["columns"]].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    with np.errstate(invalid="ignore"):
+        return {
+            "non_finite": ~finite,
+            "non_positive": finite & rules["positive"] & (values <= 0),
+            "zero": finite & rules["nonzero"] & (values == 0),
+            "below_range": finite & (values < rules["lower"]),
+            "above_range": finite & (values > rules["upper"]),
+        }
+
+
+def _describe(violations: Dict[str, np.ndarray], columns: List[str], rows: np.ndarray) -> List[str]:
+    """
+    Builds a readable description of the violated rules for each of the given rows.
+    """
+    reasons = [[] for _ in rows]
+    for rule, matrix in violations.items():
+        row_idx, col_idx = np.nonzero(matrix[rows])
+        for r, c in zip(row_idx, col_idx):
+            reasons[r].append(f"{rule}:{columns[c]}")
+    return ["; ".join(reason) for reason in reasons]
+
+
+def validate_data(
+    data: pd.DataFrame,
+    config: Dict,
+    feature_config: Dict,
+    columns: List[str]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Validates the dataset before feature generation.
+
+    In ``fail_fast`` mode any violation raises; in ``quarantine`` mode the offending
+    rows are split off so the rest of the batch can continue.
+
+    :param data: The dataset produced by create_dataset
+    :param config: The validate_data configuration (mode, ranges, max_quarantine_fraction)
+    :param feature_config: The generate_features configuration
+    :param columns: The raw columns that must be present in the dataset
+    :return: The valid rows and the quarantined rows with a ``validation_errors`` column
+    """
+    mode = config.get("mode", FAIL_FAST)
+    if mode not in (FAIL_FAST, QUARANTINE):
+        logger.error("Unknown validation mode %s.", mode)
+        raise ValueError(f"Unknown validation mode {mode}; expected {FAIL_FAST} or {QUARANTINE}.")
+
+    rules = build_rules(columns, feature_config, config)
+    missing = [c for c in rules["columns"] if c not in data.columns]
+    if missing:
+        logger.error("Dataset is missing required columns: %s", missing)
+        raise KeyError(f"Dataset is missing required columns: {missing}")
+    non_numeric = [c for c in rules["columns"] if not pd.api.types.is_numeric_dtype(data[c])]
+    if non_numeric:
+        logger.error("Columns must be numeric: %s", non_numeric)
+        raise ValueError(f"Columns must be numeric: {non_numeric}")
+
+    logger.info("Validating %d rows across %d columns.", len(data), len(rules["columns"]))
+    violations = find_violations(data, rules)
+    bad = np.logical_or.reduce(list(violations.values())).any(axis=1)
+    bad_rows = np.flatnonzero(bad)
+
+    if not len(bad_rows):
+        logger.info("All rows passed validation.")
+        return data, data.iloc[0:0].assign(validation_errors=pd.Series(dtype=str))
+
+    counts = {rule: int(matrix.any(axis=1).sum()) for rule, matrix in violations.items() if matrix.any()}
+    if mode == FAIL_FAST:
+        logger.error("Validation failed for %d rows: %s", len(bad_rows), counts)
+        raise ValueError(f"Validation failed for {len(bad_rows)} rows: {counts}")
+
+    fraction = len(bad_rows) / len(data)
+    max_fraction = config.get("max_quarantine_fraction", 1.0)
+    if fraction > max_fraction:
+        logger.error("%.1f%% of rows failed validation, above the %.1f%% limit.",
+                     fraction * 100, max_fraction * 100)
+        raise ValueError(f"{len(bad_rows)} of {len(data)} rows failed validation: {counts}")
+
+    logger.warning("Quarantining %d rows that failed validation: %s", len(bad_rows), counts)
+    quarantined = data.iloc[bad_rows].copy()
+    quarantined["validation_errors"] = _describe(violations, rules["columns"], bad_rows)
+    return data.iloc[np.flatnonzero(~bad)], quarantined
+
+
+def save_quarantine(quarantined: pd.DataFrame, save_path: Path) -> None:
+    """
+    Save quarantined rows to the specified path.
+
+    Args:
+        quarantined: The rows that failed validation.
+        save_path: The path to which the rows should be saved.
+    """
+    try:
+        quarantined.to_csv(save_path, index=False)
+        logger.debug("%d quarantined rows saved to %s", len(quarantined), save_path)
+    except Exception as e:
+        logger.error("An error occurred while trying to save quarantined rows: %s", e)
+        raise
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pytest
+from artifact_writer import ArtifactWriter
+
+
+def write_text(text, path):
+    Path(path).write_text(text)
+
+def test_artifact_writer_happy(tmp_path):
+    writer = ArtifactWriter(workers=1, max_pending=2)
+    first = writer.submit(write_text, 'first', tmp_path / 'a.txt')
+    second = writer.submit(write_text, 'second', tmp_path / 'a.txt')
+    writer.submit(write_text, 'other', tmp_path / 'b.txt')
+    writer.wait(tmp_path / 'a.txt')
+    assert first.done() and second.done()
+    writer.close()
+    assert (tmp_path / 'a.txt').read_text() == 'second'
+    assert (tmp_path / 'b.txt').read_text() == 'other'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['a.txt', 'b.txt']
+
+def test_artifact_writer_unhappy(tmp_path):
+    missing = tmp_path / 'missing' / 'a.txt'
+    writer = ArtifactWriter(workers=1)
+    writer.submit(write_text, 'optional', missing, fatal=False)
+    writer.wait()
+    writer.submit(write_text, 'required', missing)
+    with pytest.raises(OSError):
+        writer.close()
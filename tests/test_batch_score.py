@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pandas as pd
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from batch_score import split_file, run_local, queue_status, plan_units, connect_queue, claim_unit, merge_partitions, partition_path
+from score_model import score_model
+from train_model import save_model
+
+
+FEATURES = ['a', 'b']
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(3000, 2)), columns=FEATURES)
+    data['class'] = (data['a'] > 0).astype(float)
+    model = RandomForestClassifier(n_estimators=5, max_depth=3, random_state=0)
+    model.fit(data[FEATURES], data['class'])
+    save_model(model, tmp_path / 'model.pkl')
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'input_{i}.csv'
+        data.iloc[i * 1000:(i + 1) * 1000].to_csv(path, index=False)
+        paths.append(path)
+    return data, model, paths
+
+def test_split_file_happy(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('a,b\n1,2\n3,4\n5,6\n')
+    assert split_file(path, 3) == [(4, 8), (8, 12), (12, 16)]
+    assert split_file(path, 100) == [(4, 16)]
+
+def test_run_local_happy(tmp_path, inputs):
+    data, model, paths = inputs
+    config = {'unit_bytes': 4096, 'workers': 2}
+    score_config = {'initial_features': FEATURES, 'predict_proba': True}
+    merged = run_local(paths, tmp_path / 'out', tmp_path / 'model.pkl', config, score_config)
+    result = pd.read_csv(merged)
+    expected = score_model(data, model, score_config).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert set(queue_status(tmp_path / 'out')) == {'done'}
+
+def test_run_local_unhappy(tmp_path, inputs):
+    _, _, paths = inputs
+    config = {'unit_bytes': 4096, 'workers': 2, 'max_attempts': 2}
+    score_config = {'initial_features': ['missing'], 'predict_proba': True}
+    with pytest.raises(RuntimeError):
+        _ = run_local(paths, tmp_path / 'out', tmp_path / 'model.pkl', config, score_config)
+    assert set(queue_status(tmp_path / 'out')) == {'failed'}
+
+def test_claim_unit_expired_lease(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('a,b\n1,2\n')
+    plan_units([path], tmp_path / 'out', {})
+    conn = connect_queue(tmp_path / 'out')
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    assert claim_unit(conn, 'w1', 0, 2) is not None
+    assert claim_unit(conn, 'w2', 0, 2) is not None
+    assert claim_unit(conn, 'w3', 0, 2) is None
+    conn.close()
+    assert queue_status(tmp_path / 'out') == {'failed': 1}
+
+def test_merge_partitions_headers(tmp_path, inputs):
+    data, _, paths = inputs
+    data.iloc[:1000].drop(columns='class').to_csv(paths[0], index=False)
+    config = {'unit_bytes': 4096, 'workers': 2}
+    score_config = {'initial_features': FEATURES, 'predict_proba': True}
+    merged = run_local(paths, tmp_path / 'out', tmp_path / 'model.pkl', config, score_config)
+    result = pd.read_csv(merged)
+    assert len(result) == 3000
+    assert result['y_true'].isna().sum() == 1000
+
+    part = partition_path(tmp_path / 'out', 1)
+    part.write_text('y_pred\n' + part.read_text().split('\n', 1)[1])
+    with pytest.raises(RuntimeError):
+        _ = merge_partitions(tmp_path / 'out', tmp_path / 'out' / 'scores.csv')
@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pandas as pd
+import numpy as np
+import pytest
+from data_statistics import init_sketch, update_sketch, merge_sketches, compute_statistics, compute_drift
+
+
+def test_update_sketch_happy():
+    values = np.array([[1.0, 10.0], [2.0, np.nan], [3.0, np.inf]])
+    sketch = update_sketch(init_sketch(['a', 'b'], np.array([0.0, 0.0]), np.array([4.0, 20.0]), 4), values)
+    assert sketch['count'].tolist() == [3, 1]
+    assert sketch['nulls'].tolist() == [0, 1]
+    assert sketch['infs'].tolist() == [0, 1]
+    assert sketch['mean'].tolist() == [2.0, 10.0]
+    assert sketch['hist'][0].tolist() == [0, 0, 1, 1, 1, 0]
+    assert sketch['hist'][1].tolist() == [0, 0, 0, 1, 0, 0]
+
+def test_merge_sketches_happy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1000, 2))
+    lo, hi = np.array([-5.0, -5.0]), np.array([5.0, 5.0])
+    whole = update_sketch(init_sketch(['a', 'b'], lo, hi, 10), values)
+    left = update_sketch(init_sketch(['a', 'b'], lo, hi, 10), values[:300])
+    right = update_sketch(init_sketch(['a', 'b'], lo, hi, 10), values[300:])
+    merged = merge_sketches(left, right)
+    np.testing.assert_allclose(merged['mean'], whole['mean'])
+    np.testing.assert_allclose(merged['m2'], whole['m2'])
+    assert (merged['hist'] == whole['hist']).all()
+
+def test_merge_sketches_unhappy():
+    left = init_sketch(['a'], np.array([0.0]), np.array([1.0]), 10)
+    right = init_sketch(['a'], np.array([0.0]), np.array([2.0]), 10)
+    with pytest.raises(ValueError):
+        _ = merge_sketches(left, right)
+
+def test_compute_statistics_happy():
+    data = pd.DataFrame({'a': [1.0, 2.0, 3.0, 4.0, np.nan, 6.0], 'class': [0, 0, 0, 1, 1, 1]})
+    result = compute_statistics(data, {'chunk_size': 4, 'bins': 5})
+    assert set(result) == {'0', '1', 'all'}
+    assert result['all']['a']['count'] == 5
+    assert result['all']['a']['null_count'] == 1
+    assert result['all']['a']['min'] == 1.0
+    assert result['all']['a']['max'] == 6.0
+    assert result['all']['a']['mean'] == pytest.approx(3.2)
+    assert result['all']['a']['std'] == pytest.approx(data['a'].std())
+    assert result['0']['a']['mean'] == pytest.approx(2.0)
+
+def test_compute_drift_happy():
+    rng = np.random.default_rng(0)
+    reference_data = pd.DataFrame({'a': rng.normal(size=2000), 'class': 0})
+    shifted_data = pd.DataFrame({'a': rng.normal(loc=1.0, size=2000), 'class': 0})
+    reference = compute_statistics(reference_data, {})
+    same = compute_statistics(reference_data, {}, reference)
+    shifted = compute_statistics(shifted_data, {}, reference)
+    assert not compute_drift(same, reference, {})['all']['a']['drift']
+    assert compute_drift(shifted, reference, {})['all']['a']['drift']
+
+def make_sorted_classes():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'a': np.concatenate([rng.normal(0, 1, 5000), rng.normal(10, 1, 5000)]),
+                         'class': [0.0] * 5000 + [1.0] * 5000})
+
+def test_compute_statistics_sorted_chunks():
+    data = make_sorted_classes()
+    result = compute_statistics(data, {'chunk_size': 1000, 'bins': 50})
+    expected = data[data['class'] == 1]['a'].quantile([0.05, 0.5, 0.95]).tolist()
+    quantiles = result['1']['a']['quantiles']
+    assert [quantiles[0.05], quantiles[0.5], quantiles[0.95]] == pytest.approx(expected, abs=0.1)
+    counts = result['1']['a']['histogram']['counts']
+    assert counts[0] == 0 and counts[-1] == 0
+
+def test_compute_statistics_chunk_iterable_ranges(caplog):
+    data = make_sorted_classes()
+    chunks = [data.iloc[start:start + 1000] for start in range(0, len(data), 1000)]
+    result = compute_statistics(iter(chunks), {'bins': 50, 'ranges': {'a': [-5, 15]}})
+    assert result['1']['a']['histogram']['lo'] == -5
+    assert result['1']['a']['quantiles'][0.5] == pytest.approx(10.0, abs=0.1)
+    assert 'outside the histogram range' not in caplog.text
+
+    _ = compute_statistics(iter(chunks), {'bins': 50})
+    assert 'outside the histogram range' in caplog.text
+
+def test_compute_statistics_declared_ranges_single_pass(caplog):
+    data = make_sorted_classes()
+    caplog.set_level('INFO')
+    result = compute_statistics(data, {'chunk_size': 1000, 'bins': 50, 'ranges': {'a': [-5, 15]}})
+    assert result['all']['a']['histogram']['lo'] == -5
+    assert 'Pre-scanning' not in caplog.text
@@ -0,0 +1,146 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pandas as pd
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+import incremental
+from incremental import (read_new_lines, update_reservoir, commit_update, train_incremental, advance_offset,
+                         load_state, load_reservoir, split_rows)
+from score_model import score_model
+from evaluate_performance import evaluate_performance, compute_metrics
+
+
+FEATURES = ['a']
+TRAIN_CONFIG = {'test_size': 0.25, 'n_estimators': 4, 'max_depth': 2, 'initial_features': FEATURES}
+
+
+def make_features(n, label=None):
+    rng = np.random.default_rng(n)
+    labels = rng.integers(0, 2, n).astype(float) if label is None else np.full(n, label)
+    return pd.DataFrame({'a': rng.normal(size=n) + labels, 'class': labels})
+
+def test_read_new_lines_happy(tmp_path):
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n3 4\n5')
+    lines, first_line, offset = read_new_lines(raw, {})
+    assert lines == ['1 2\n', '3 4\n'] and first_line == 0 and offset == 8
+
+    state = {}
+    commit_update(state, tmp_path / 'state', RandomForestClassifier(), make_features(8), make_features(2),
+                  raw, offset, 2, {})
+    with raw.open('a') as f:
+        f.write(' 6\n7 8\n')
+    lines, first_line, offset = read_new_lines(raw, state)
+    assert lines == ['5 6\n', '7 8\n'] and first_line == 2 and offset == 16
+
+def test_read_new_lines_rewritten(tmp_path):
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n3 4\n')
+    state = {}
+    commit_update(state, tmp_path / 'state', RandomForestClassifier(), make_features(8), make_features(2), raw, 8, 2, {})
+    raw.write_text('9 9\n3 4\n5 6\n')
+    lines, first_line, offset = read_new_lines(raw, state)
+    assert lines == ['9 9\n', '3 4\n', '5 6\n'] and first_line == 0 and offset == 12
+
+def test_update_reservoir_happy():
+    seen = {}
+    reservoir = update_reservoir(pd.DataFrame(), make_features(50, 0.0), seen, 20)
+    reservoir = update_reservoir(reservoir, make_features(500, 1.0), seen, 20)
+    reservoir = update_reservoir(reservoir, make_features(100, 0.0), seen, 20)
+    assert reservoir['class'].value_counts().to_dict() == {0.0: 20, 1.0: 20}
+    assert seen == {0.0: 150, 1.0: 500}
+
+def test_train_incremental_happy(tmp_path):
+    state_dir = tmp_path / 'state'
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n')
+    config = {'trees_per_update': 3, 'max_trees': 8, 'reservoir_rows': 50}
+    state = {}
+    for features in [make_features(200), make_features(40, 1.0), make_features(40, 1.0)]:
+        new_train, new_test = split_rows(features, TRAIN_CONFIG['test_size'])
+        model, train, test = train_incremental(new_train, new_test, state, state_dir, TRAIN_CONFIG, config)
+        commit_update(state, state_dir, model, new_train, new_test, raw, 4, 1, config)
+    assert len(model.estimators_) == 8
+    assert state['generations'] == [0, 0, 1, 1, 1, 2, 2, 2]
+    assert len(pd.read_csv(state_dir / 'dataset.csv')) == 280
+    assert model.predict_proba(test[FEATURES]).shape == (len(test), 2)
+
+def test_train_incremental_single_class(tmp_path):
+    state_dir = tmp_path / 'state'
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n')
+    config = {'trees_per_update': 3, 'reservoir_rows': 50}
+    state = {}
+    for features in [make_features(200), make_features(40, 1.0)]:
+        new_train, new_test = split_rows(features, TRAIN_CONFIG['test_size'])
+        model, train, test = train_incremental(new_train, new_test, state, state_dir, TRAIN_CONFIG, config)
+        commit_update(state, state_dir, model, new_train, new_test, raw, 4, 1, config)
+    assert set(test['class']) == {0.0, 1.0}
+    trained = set(map(tuple, load_reservoir(state_dir, state['reservoir_file']).to_numpy()))
+    assert not set(map(tuple, test.to_numpy())) & (trained | set(map(tuple, train.to_numpy())))
+    scores = score_model(test, model, {'initial_features': FEATURES})
+    metrics = evaluate_performance(scores, {})
+    assert 0.0 <= metrics['roc_auc_score'] <= 1.0
+
+def test_compute_metrics_single_class():
+    y_true = pd.Series([1.0, 1.0, 1.0])
+    metrics = compute_metrics(y_true, pd.Series([0.9, 0.2, 0.8]), pd.Series([1.0, 0.0, 1.0]))
+    assert 'roc_auc_score' not in metrics
+    assert metrics['accuracy_score'] == 2 / 3
+
+def test_advance_offset_happy(tmp_path):
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n')
+    state = {}
+    commit_update(state, tmp_path / 'state', RandomForestClassifier(), make_features(8), make_features(2), raw, 4, 1, {})
+    with raw.open('a') as f:
+        f.write('bad row\n')
+    lines, first_line, offset = read_new_lines(raw, state)
+    advance_offset(state, tmp_path / 'state', raw, offset, first_line + len(lines))
+    state = load_state(tmp_path / 'state')
+    assert read_new_lines(raw, state) == ([], 2, 12)
+    assert len(pd.read_csv(tmp_path / 'state' / 'dataset.csv')) == 10
+
+def test_train_incremental_small_batch(tmp_path):
+    state_dir = tmp_path / 'state'
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n')
+    config = {'trees_per_update': 3, 'reservoir_rows': 50}
+    state = {}
+    for features in [make_features(200), make_features(1)]:
+        new_train, new_test = split_rows(features, TRAIN_CONFIG['test_size'])
+        model, train, test = train_incremental(new_train, new_test, state, state_dir, TRAIN_CONFIG, config)
+        commit_update(state, state_dir, model, new_train, new_test, raw, 4, 1, config)
+    assert len(model.estimators_) == 7
+    assert len(test) and set(test['class']) == {0.0, 1.0}
+
+def test_commit_update_interrupted(tmp_path, monkeypatch):
+    state_dir = tmp_path / 'state'
+    raw = tmp_path / 'clouds.data'
+    raw.write_text('1 2\n')
+    config = {'trees_per_update': 3, 'reservoir_rows': 50}
+    state = {}
+    new_train, new_test = split_rows(make_features(200), TRAIN_CONFIG['test_size'])
+    model, _, _ = train_incremental(new_train, new_test, state, state_dir, TRAIN_CONFIG, config)
+    commit_update(state, state_dir, model, new_train, new_test, raw, 4, 1, config)
+
+    def interrupt(*args):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(incremental, 'advance_offset', interrupt)
+    state = load_state(state_dir)
+    new_train, new_test = split_rows(make_features(40), TRAIN_CONFIG['test_size'])
+    model, _, _ = train_incremental(new_train, new_test, state, state_dir, TRAIN_CONFIG, config)
+    with pytest.raises(KeyboardInterrupt):
+        commit_update(state, state_dir, model, new_train, new_test, raw, 4, 1, config)
+    monkeypatch.undo()
+
+    state = load_state(state_dir)
+    assert len(state['generations']) == 4
+    model, _, _ = train_incremental(new_train, new_test, state, state_dir, TRAIN_CONFIG, config)
+    commit_update(state, state_dir, model, new_train, new_test, raw, 4, 1, config)
+    assert len(model.estimators_) == len(state['generations']) == 7
+    assert sorted(p.name.split('-')[0] for p in state_dir.iterdir()) == [
+        'dataset.csv', 'holdout', 'model', 'reservoir', 'state.yaml']
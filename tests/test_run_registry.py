@@ -0,0 +1,83 @@
+import sys
+import shutil
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+import pytest
+import yaml
+from run_registry import connect, index_run, rebuild_index, parse_filter, query_runs, compare_runs
+
+
+def make_run(runs, run_id, max_depth, criterion, auc, numpy_metrics=False):
+    run_dir = runs / run_id
+    run_dir.mkdir(parents=True)
+    config = {'run_config': {'name': 'rf'},
+              'train_model': {'max_depth': max_depth, 'criterion': criterion, 'initial_features': ['a']}}
+    metrics = {'roc_auc_score': np.float64(auc) if numpy_metrics else auc,
+               'confusion_matrix': [[1, 2], [3, 4]]}
+    with (run_dir / 'config.yaml').open('w') as f:
+        yaml.dump(config, f)
+    with (run_dir / 'metrics.yaml').open('w') as f:
+        yaml.dump(metrics, f)
+    with (run_dir / 'timings.yaml').open('w') as f:
+        yaml.dump({'train_model': 1.5}, f)
+    return run_dir
+
+@pytest.fixture
+def registry(tmp_path):
+    runs = tmp_path / 'runs'
+    make_run(runs, '1', 3, 'gini', 0.80)
+    make_run(runs, '2', 5, 'entropy', 0.90)
+    make_run(runs, '3', 8, 'gini', 0.95)
+    conn = connect(runs / 'registry.sqlite')
+    rebuild_index(conn, runs)
+    yield conn, runs
+    conn.close()
+
+def test_parse_filter_happy():
+    assert parse_filter('max_depth<=5') == ('max_depth', '<=', '5')
+    assert parse_filter(' criterion == gini ') == ('criterion', '=', 'gini')
+    assert parse_filter('n_estimators!=10') == ('n_estimators', '!=', '10')
+
+def test_parse_filter_unhappy():
+    with pytest.raises(ValueError):
+        _ = parse_filter('max_depth')
+    with pytest.raises(ValueError):
+        _ = parse_filter('<=5')
+
+def test_query_runs_numeric_filter(registry):
+    conn, _ = registry
+    result = query_runs(conn, 'roc_auc_score', ['max_depth<=5'])
+    assert [(run_id, value) for run_id, value, _ in result] == [('2', 0.90), ('1', 0.80)]
+    assert [r[0] for r in query_runs(conn, 'roc_auc_score', ascending=True, limit=1)] == ['1']
+
+def test_query_runs_string_filter(registry):
+    conn, _ = registry
+    result = query_runs(conn, 'roc_auc_score', ['criterion=gini', 'max_depth>3'])
+    assert [r[0] for r in result] == ['3']
+
+def test_rebuild_index_counts(registry):
+    conn, runs = registry
+    assert rebuild_index(conn, runs) == (0, 3, 0)
+    shutil.rmtree(runs / '1')
+    make_run(runs, '4', 4, 'gini', 0.70)
+    assert rebuild_index(conn, runs) == (1, 2, 1)
+    assert sorted(r[0] for r in query_runs(conn, 'roc_auc_score')) == ['2', '3', '4']
+
+def test_index_run_numpy_metrics(tmp_path):
+    run_dir = make_run(tmp_path / 'runs', '1', 3, 'gini', 0.85, numpy_metrics=True)
+    conn = connect(tmp_path / 'registry.sqlite')
+    index_run(conn, run_dir)
+    assert query_runs(conn, 'roc_auc_score')[0][1] == pytest.approx(0.85)
+    index_run(conn, run_dir, {'roc_auc_score': 0.5})
+    assert query_runs(conn, 'roc_auc_score')[0][1] == pytest.approx(0.5)
+
+def test_compare_runs_happy(registry):
+    conn, _ = registry
+    comparison = compare_runs(conn, ['1', '2'])
+    assert comparison['params']['max_depth'] == {'1': '3', '2': '5'}
+    assert comparison['metrics']['roc_auc_score'] == {'1': 0.80, '2': 0.90}
+    assert comparison['timings']['train_model'] == {'1': 1.5, '2': 1.5}
+    assert set(comparison['artifacts']) == {'config.yaml', 'metrics.yaml', 'timings.yaml'}
+    assert comparison['config_hash']['config_hash']['1'] != comparison['config_hash']['config_hash']['2']
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pandas as pd
+import numpy as np
+import pytest
+from validate_data import validate_data
+
+
+FEATURE_CONFIG = {
+    'log_transform': {'log_entropy': 'visible_entropy'},
+    'calculate_norm_range': {'IR_norm_range': {'min_col': 'IR_min', 'max_col': 'IR_max', 'mean_col': 'IR_mean'}},
+}
+COLUMNS = ['visible_entropy', 'IR_min', 'IR_max', 'IR_mean']
+
+
+def make_data():
+    return pd.DataFrame({'visible_entropy': [1.0, 0.0, 2.0, 3.0, 4.0],
+                         'IR_min': [1.0, 2.0, np.nan, 3.0, 1.0],
+                         'IR_max': [4.0, 5.0, 6.0, 7.0, 300.0],
+                         'IR_mean': [2.5, 3.5, 4.5, 0.0, 2.0],
+                         'class': [0.0, 0.0, 1.0, 1.0, 1.0]})
+
+def test_validate_data_happy():
+    data = make_data().iloc[[0]]
+    valid, quarantined = validate_data(data, {'mode': 'fail_fast'}, FEATURE_CONFIG, COLUMNS)
+    assert valid.equals(data)
+    assert quarantined.empty
+    assert 'validation_errors' in quarantined.columns
+
+def test_validate_data_quarantine():
+    config = {'mode': 'quarantine', 'ranges': {'IR_max': [0, 255]}}
+    valid, quarantined = validate_data(make_data(), config, FEATURE_CONFIG, COLUMNS)
+    assert valid.index.tolist() == [0]
+    assert quarantined.index.tolist() == [1, 2, 3, 4]
+    assert quarantined['validation_errors'].tolist() == ['non_positive:visible_entropy',
+                                                         'non_finite:IR_min',
+                                                         'zero:IR_mean',
+                                                         'above_range:IR_max']
+
+def test_validate_data_fail_fast_unhappy():
+    with pytest.raises(ValueError):
+        _ = validate_data(make_data(), {'mode': 'fail_fast'}, FEATURE_CONFIG, COLUMNS)
+
+def test_validate_data_max_fraction_unhappy():
+    config = {'mode': 'quarantine', 'max_quarantine_fraction': 0.5}
+    with pytest.raises(ValueError):
+        _ = validate_data(make_data(), config, FEATURE_CONFIG, COLUMNS)
+
+def test_validate_data_missing_column_unhappy():
+    data = make_data().drop(columns='IR_mean')
+    with pytest.raises(KeyError):
+        _ = validate_data(data, {'mode': 'quarantine'}, FEATURE_CONFIG, COLUMNS)